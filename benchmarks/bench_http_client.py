@@ -0,0 +1,66 @@
+# bench_http_client.py
+"""
+Micro-benchmark: per-request overhead of a fresh requests call versus the
+pooled keep-alive OllamaClient, against /api/tags of the mock server.
+
+Run from the repository root:
+    python benchmarks/bench_http_client.py [--requests 500]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.mock_ollama import MockOllamaServer
+from ollama.core.client import OllamaClient
+
+def time_calls(call, count):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = call()
+        response.content
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def report(label, samples):
+    ordered = sorted(samples)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(f"{label:<28} mean {statistics.mean(samples) * 1e6:8.1f} us   "
+          f"p50 {statistics.median(samples) * 1e6:8.1f} us   p95 {p95 * 1e6:8.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500, help="requests per variant")
+    args = parser.parse_args()
+
+    server = MockOllamaServer()
+    base_url = server.start()
+    try:
+        url = f"{base_url}/api/tags"
+        # Warm both paths once so imports and the first connect are not measured.
+        requests.get(url, timeout=5)
+        client = OllamaClient(base_url)
+        client.get("/api/tags", timeout=5)
+
+        before = time_calls(lambda: requests.get(url, timeout=5), args.requests)
+        after = time_calls(lambda: client.get("/api/tags", timeout=5), args.requests)
+
+        print(f"{args.requests} GET /api/tags against {base_url}")
+        report("requests.get (new conn)", before)
+        report("OllamaClient (pooled)", after)
+        print(f"speed-up (mean): {statistics.mean(before) / statistics.mean(after):.2f}x")
+        client.close()
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# bench_search_parser.py
+"""
+Parse time and correctness of the search result extractors
+(ollama/core/search_parser.py) over saved result pages in
+benchmarks/fixtures, next to the regex scraping they replaced.
+
+  fixtures  time per page and fields matching the expected results
+            (benchmarks/fixtures/search_results_expected.json)
+  scaling   time as the page grows: padding after the results, padding
+            before them, and unterminated result blocks (worst case for
+            the regexes)
+
+Run from the repository root:
+    python benchmarks/bench_search_parser.py [--only fixtures] [--repeat 50]
+"""
+import argparse
+import html
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ollama.core.search_parser import MAX_PAGE_CHARS, parse_results
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+FIELDS = ("title", "snippet", "url")
+
+
+def legacy_parse(engine, content, max_results):
+    # The regex scraping search.perform_web_search used before the extractors.
+    results = []
+    if engine == "DuckDuckGo":
+        for div in re.findall(r'<div class="result__body">(.*?)</div>\s*</div>', content, re.DOTALL)[:max_results]:
+            title = re.search(r'<a class="result__a" href=".*?">(.*?)</a>', div, re.DOTALL)
+            snippet = re.search(r'<a class="result__snippet".*?>(.*?)</a>', div, re.DOTALL)
+            url = re.search(r'<a class="result__a" href="(.*?)"', div, re.DOTALL)
+            results.append({
+                "title": html.unescape(re.sub(r"<.*?>", "", title.group(1))) if title else "",
+                "snippet": html.unescape(re.sub(r"<.*?>", "", snippet.group(1))) if snippet else "",
+                "url": url.group(1) if url else "",
+            })
+    else:
+        for div in re.findall(r'<div class="g">(.*?)</div>\s*</div>\s*</div>', content, re.DOTALL)[:max_results]:
+            title = re.search(r'<h3 class=".*?">(.*?)</h3>', div, re.DOTALL)
+            snippet = re.search(r'<span class=".*?">(.*?)</span>', div, re.DOTALL)
+            url = re.search(r'<a href="(https?://.*?)"', div, re.DOTALL)
+            results.append({
+                "title": html.unescape(re.sub(r"<.*?>", "", title.group(1))) if title else "",
+                "snippet": html.unescape(re.sub(r"<.*?>", "", snippet.group(1))) if snippet else "",
+                "url": url.group(1) if url else "",
+            })
+    return results
+
+
+def current_parse(engine, content, max_results):
+    return parse_results(engine, content, max_results)[0]
+
+
+PARSERS = {"extractor": current_parse, "regex": legacy_parse}
+
+
+def timed(call, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def score(results, expected):
+    # Fields equal to the expected ones, after collapsing whitespace.
+    matched = 0
+    for result, wanted in zip(results, expected):
+        matched += sum(" ".join(str(result.get(f, "")).split()) == wanted[f] for f in FIELDS)
+    return matched, len(expected) * len(FIELDS)
+
+
+def bench_fixtures(args):
+    with open(os.path.join(FIXTURES, "search_results_expected.json"), "r", encoding="utf-8") as f:
+        expectations = json.load(f)
+    for name, expected in expectations.items():
+        with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as f:
+            content = f.read()
+        print(f"{name} ({len(content) // 1024} KB, {expected['engine']})")
+        for max_results in (3, len(expected["results"])):
+            wanted = expected["results"][:max_results]
+            for label, parse in PARSERS.items():
+                samples = timed(lambda: parse(expected["engine"], content, max_results), args.repeat)
+                matched, total = score(parse(expected["engine"], content, max_results), wanted)
+                print(f"  {label:<10} max_results={max_results:<3} p50 {statistics.median(samples) * 1e3:8.3f} ms   "
+                      f"fields correct {matched}/{total}")
+
+
+def bench_scaling(args):
+    with open(os.path.join(FIXTURES, "duckduckgo_results.html"), "r", encoding="utf-8") as f:
+        page = f.read()
+    cut = page.index('<div class="result ')
+    filler = '<div class="c1"><p>filler <b>text</b> &amp; more</p></div>\n'
+    blocks = '<div class="result__body"><a class="result__a" href="/x">unterminated '
+    print(f"DuckDuckGo page, 3 results (extractor input capped at {MAX_PAGE_CHARS // 1024} KB)")
+    for size_kb in args.sizes:
+        padding = filler * (size_kb * 1024 // len(filler))
+        cases = {
+            "padding after": page + padding,
+            "padding before": page[:cut] + padding + page[cut:],
+            # Quadratic for the non-greedy DOTALL regexes; kept smaller so they finish.
+            "unterminated": page[:cut] + blocks * (size_kb * 64 // len(blocks)),
+        }
+        for case, content in cases.items():
+            for label, parse in PARSERS.items():
+                repeat = max(1, args.repeat // 10)
+                samples = timed(lambda: parse("DuckDuckGo", content, 3), repeat)
+                print(f"  {len(content) // 1024:>6} KB {case:<15} {label:<10} "
+                      f"p50 {statistics.median(samples) * 1e3:10.3f} ms")
+
+
+BENCHMARKS = {
+    "fixtures": bench_fixtures,
+    "scaling": bench_scaling,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--repeat", type=int, default=50, help="timed runs per measurement")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 4000], help="padding sizes in KB")
+    args = parser.parse_args()
+    for name in args.only or BENCHMARKS:
+        print(f"== {name}")
+        BENCHMARKS[name](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# bench_suite.py
+"""
+Benchmark suite against the mock Ollama server (benchmarks/mock_ollama.py),
+so results do not depend on a GPU, a model or the network:
+
+  overhead   per-call cost of api.generate_response over a bare HTTP POST
+  stream     tokens/s delivered by the sync and async streaming paths
+  ui         tokens/s the chat window can display when streamed the way the
+             GUI does it (skipped without a display)
+  scheduler  admission order, queue waits and peak server concurrency
+  pull       /api/pull progress records/s through api.pull_model
+
+Run from the repository root:
+    python benchmarks/bench_suite.py [--only stream scheduler] [--tokens 2000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.mock_ollama import MockOllamaServer
+from ollama.core import api, async_api
+from ollama.core.scheduler import BATCH, INTERACTIVE, PRIORITY_NAMES, get_scheduler
+
+MODEL = "llama3:latest"
+
+
+def report(label, samples):
+    ordered = sorted(samples)
+    p95 = ordered[int(0.95 * (len(ordered) - 1))]
+    print(f"  {label:<30} mean {statistics.mean(samples) * 1e3:8.3f} ms   "
+          f"p50 {statistics.median(samples) * 1e3:8.3f} ms   p95 {p95 * 1e3:8.3f} ms")
+
+
+def timed(call, count):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_overhead(args):
+    server = MockOllamaServer(token_rate=0, first_token_delay=0, load_delay=0, response_tokens=1)
+    url = server.start()
+    try:
+        payload = api.generate_payload(MODEL, "hi")
+        session = requests.Session()
+        session.post(f"{url}/api/generate", json=payload).json()
+        api.generate_response(url, MODEL, "hi")
+        raw, wrapped = [], []
+        # Interleaved so drift (CPU frequency, other load) affects both alike.
+        for _ in range(args.requests):
+            raw += timed(lambda: session.post(f"{url}/api/generate", json=payload).json(), 1)
+            wrapped += timed(lambda: api.generate_response(url, MODEL, "hi"), 1)
+        print(f"overhead: {args.requests} one-token completions")
+        report("requests.Session.post", raw)
+        report("api.generate_response", wrapped)
+        print(f"  client overhead per call: {(statistics.mean(wrapped) - statistics.mean(raw)) * 1e6:.0f} us")
+    finally:
+        server.stop()
+
+
+def bench_stream(args):
+    server = MockOllamaServer(token_rate=0, first_token_delay=0, load_delay=0, response_tokens=args.tokens)
+    url = server.start()
+    try:
+        api.generate_response(url, MODEL, "warm up", on_token=lambda token: None)
+        print(f"stream: {args.tokens} tokens, server unthrottled")
+        for label, run in (
+            ("api (sync)", lambda on_token: api.generate_response(url, MODEL, "hi", on_token=on_token)),
+            ("async_api", lambda on_token: async_api.submit(
+                async_api.generate_response(url, MODEL, "hi", on_token=on_token)).result()),
+        ):
+            received = []
+            start = time.perf_counter()
+            result = run(received.append)
+            elapsed = time.perf_counter() - start
+            metrics = result.get("metrics") or {}
+            print(f"  {label:<30} {len(received) / elapsed:10.0f} tokens/s   "
+                  f"first token {metrics.get('time_to_first_token', 0) * 1e3:.2f} ms")
+    finally:
+        server.stop()
+
+
+def bench_ui(args):
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:
+        print(f"ui: skipped ({e})")
+        return
+    from ollama.gui.chat_interface import ChatInterface
+
+    root.withdraw()
+    chat = ChatInterface(tk.Frame(root), lambda text: None, lambda: None, lambda *flags: None)
+    server = MockOllamaServer(token_rate=0, first_token_delay=0, load_delay=0, response_tokens=args.tokens)
+    url = server.start()
+    shown = []
+
+    def on_token(token):
+        # Same hand-off as OllamaApp.process_message: every fragment goes through root.after.
+        root.after(0, chat.append_to_streamed_message, token)
+        root.after(0, shown.append, token)
+
+    try:
+        chat.begin_streamed_message("AI", "ai")
+        start = time.perf_counter()
+        future = async_api.submit(async_api.generate_response(url, MODEL, "hi", on_token=on_token))
+        while not (future.done() and len(shown) == args.tokens):
+            root.update()
+        elapsed = time.perf_counter() - start
+        print(f"ui: {args.tokens} tokens streamed into the chat window")
+        print(f"  {'displayed':<30} {args.tokens / elapsed:10.0f} tokens/s")
+    finally:
+        server.stop()
+        root.destroy()
+
+
+def bench_scheduler(args):
+    server = MockOllamaServer(token_rate=200, first_token_delay=0.02, load_delay=0, response_tokens=20)
+    url = server.start()
+    scheduler = get_scheduler(url, max_concurrent=2)
+    finished = []
+    lock = threading.Lock()
+
+    def run(name, priority):
+        api.generate_response(url, MODEL, name, priority=priority, on_token=lambda token: None)
+        with lock:
+            finished.append(name)
+
+    try:
+        threads = [threading.Thread(target=run, args=(f"batch{i}", BATCH)) for i in range(args.batch)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        interactive = [threading.Thread(target=run, args=(f"chat{i}", INTERACTIVE)) for i in range(args.interactive)]
+        for thread in interactive:
+            thread.start()
+        for thread in threads + interactive:
+            thread.join()
+        metrics = scheduler.metrics()
+        print(f"scheduler: {args.batch} batch + {args.interactive} interactive requests, "
+              f"max_concurrent={metrics['max_concurrent']}")
+        print(f"  completion order: {' '.join(finished)}")
+        print(f"  peak concurrent requests at the server: {server.stats['max_active']}")
+        for name in PRIORITY_NAMES.values():
+            stats = metrics["classes"][name]
+            if stats["admitted"]:
+                print(f"  {name:<12} admitted {stats['admitted']:3d}   wait avg {stats['wait_avg'] * 1e3:7.1f} ms   "
+                      f"p95 {stats['wait_p95'] * 1e3:7.1f} ms")
+    finally:
+        server.stop()
+
+
+def bench_pull(args):
+    server = MockOllamaServer(pull_steps=args.pull_steps, pull_delay=0)
+    url = server.start()
+    try:
+        start = time.perf_counter()
+        records = sum(1 for _ in api.pull_model(url, "mistral:latest"))
+        elapsed = time.perf_counter() - start
+        print(f"pull: {records} progress records")
+        print(f"  {'api.pull_model':<30} {records / elapsed:10.0f} records/s")
+    finally:
+        server.stop()
+
+
+BENCHMARKS = {
+    "overhead": bench_overhead,
+    "stream": bench_stream,
+    "ui": bench_ui,
+    "scheduler": bench_scheduler,
+    "pull": bench_pull,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="benchmarks to run (default: all)")
+    parser.add_argument("--requests", type=int, default=300, help="calls for the overhead benchmark")
+    parser.add_argument("--tokens", type=int, default=2000, help="tokens for the stream and ui benchmarks")
+    parser.add_argument("--batch", type=int, default=6, help="batch requests for the scheduler benchmark")
+    parser.add_argument("--interactive", type=int, default=2, help="interactive requests for the scheduler benchmark")
+    parser.add_argument("--pull-steps", type=int, default=2000, help="progress records for the pull benchmark")
+    args = parser.parse_args()
+
+    for name in args.only or BENCHMARKS:
+        BENCHMARKS[name](args)
+
+
+if __name__ == "__main__":
+    main()
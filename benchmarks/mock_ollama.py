@@ -0,0 +1,348 @@
+# mock_ollama.py
+"""
+Stand-in Ollama server for deterministic benchmarks and manual testing on a
+machine without a GPU, a model or network access.
+
+Implements /api/tags, /api/show, /api/generate (streaming and not, including the
+empty-prompt load/unload requests), /api/chat, /api/embeddings and
+/api/pull. Answers are made of numbered filler tokens produced at a fixed
+rate after a fixed first-token delay; a model that is not resident pays
+load_delay first, as with the real server. Final chunks carry the same
+timing fields Ollama reports (durations in nanoseconds, measured).
+
+Use it in-process:
+    server = MockOllamaServer(token_rate=200, first_token_delay=0.05)
+    url = server.start()
+    ...
+    server.stop()
+
+or standalone (then point CoreManager at it):
+    python benchmarks/mock_ollama.py --port 11434 --token-rate 40
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_MODELS = ["llama3:latest", "phi3:latest"]
+
+
+class MockOllamaServer:
+    """
+    token_rate        tokens per second while generating (0: as fast as possible)
+    first_token_delay seconds before the first token (prompt evaluation)
+    load_delay        seconds to "load" a model that is not resident
+    response_tokens   tokens per answer, capped by the request's num_predict
+    token_text        text of every token; "{i}" is replaced by its index
+    error_rate        fraction of model requests answered with error_status
+    pull_steps        progress records streamed per /api/pull
+    embedding_dim     length of /api/embeddings vectors
+    context_length    trained context length reported by /api/show
+    seed              seeds error injection so runs are repeatable
+    """
+
+    def __init__(self, models=None, token_rate=50.0, first_token_delay=0.05, load_delay=0.5,
+                 response_tokens=64, token_text="tok{i} ", error_rate=0.0, error_status=500,
+                 pull_steps=20, pull_delay=0.01, embedding_dim=384, context_length=8192, seed=0,
+                 host="127.0.0.1", port=0):
+        self.models = list(models or DEFAULT_MODELS)
+        self.token_rate = token_rate
+        self.first_token_delay = first_token_delay
+        self.load_delay = load_delay
+        self.response_tokens = response_tokens
+        self.token_text = token_text
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.pull_steps = pull_steps
+        self.pull_delay = pull_delay
+        self.embedding_dim = embedding_dim
+        self.context_length = context_length
+        self.host = host
+        self.port = port
+        self.loaded = set()
+        self.stats = {"requests": {}, "errors": 0, "active": 0, "max_active": 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    # Lifecycle.
+
+    def start(self):
+        server = self
+
+        class Handler(MockOllamaHandler):
+            mock = server
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="mock-ollama", daemon=True).start()
+        return self.url
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {"requests": {}, "errors": 0, "active": 0, "max_active": 0}
+
+    # Behaviour shared by the handlers.
+
+    def begin(self, path):
+        with self._lock:
+            self.stats["requests"][path] = self.stats["requests"].get(path, 0) + 1
+            self.stats["active"] += 1
+            self.stats["max_active"] = max(self.stats["max_active"], self.stats["active"])
+
+    def end(self):
+        with self._lock:
+            self.stats["active"] -= 1
+
+    def inject_error(self):
+        with self._lock:
+            failed = self.error_rate > 0 and self._random.random() < self.error_rate
+            if failed:
+                self.stats["errors"] += 1
+        return failed
+
+    def load(self, model, keep_alive=None):
+        # Returns the simulated load time in seconds.
+        if keep_alive in (0, "0", "0s"):
+            with self._lock:
+                self.loaded.discard(model)
+            return 0.0
+        with self._lock:
+            resident = model in self.loaded
+            self.loaded.add(model)
+        if resident:
+            return 0.0
+        time.sleep(self.load_delay)
+        return self.load_delay
+
+    def tokens(self, num_predict=None):
+        count = self.response_tokens
+        if num_predict is not None and num_predict >= 0:
+            count = min(count, num_predict)
+        for i in range(count):
+            yield self.token_text.replace("{i}", str(i))
+
+    def token_interval(self):
+        return 1.0 / self.token_rate if self.token_rate else 0.0
+
+    def embedding(self, text):
+        # Deterministic unit vector derived from the text.
+        values = []
+        counter = 0
+        while len(values) < self.embedding_dim:
+            digest = hashlib.sha256(f"{counter}:{text}".encode("utf-8")).digest()
+            values.extend(b / 255.0 - 0.5 for b in digest)
+            counter += 1
+        values = values[:self.embedding_dim]
+        norm = sum(v * v for v in values) ** 0.5 or 1.0
+        return [v / norm for v in values]
+
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Ollama's Go server sets TCP_NODELAY; without it small chunks hit Nagle's delay.
+    disable_nagle_algorithm = True
+    mock = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def start_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def send_chunk(self, data):
+        line = json.dumps(data).encode("utf-8") + b"\n"
+        self.wfile.write(f"{len(line):x}\r\n".encode("ascii") + line + b"\r\n")
+        self.wfile.flush()
+
+    def end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        self.mock.begin(self.path)
+        try:
+            if self.path == "/api/tags":
+                self.send_json({"models": [{"name": name, "model": name, "size": 0} for name in self.mock.models]})
+            else:
+                self.send_json({"error": "not found"}, 404)
+        finally:
+            self.mock.end()
+
+    def do_POST(self):
+        self.mock.begin(self.path)
+        try:
+            request = self.read_json()
+            routes = {
+                "/api/generate": self.generate,
+                "/api/chat": self.chat,
+                "/api/embeddings": self.embeddings,
+                "/api/show": self.show,
+                "/api/pull": self.pull,
+            }
+            route = routes.get(self.path)
+            if route is None:
+                self.send_json({"error": "not found"}, 404)
+            elif self.path == "/api/show":
+                route(request)
+            elif self.path != "/api/pull" and request.get("model") not in self.mock.models:
+                self.send_json({"error": f"model '{request.get('model')}' not found"}, 404)
+            elif self.path != "/api/pull" and self.mock.inject_error():
+                self.send_json({"error": "injected failure"}, self.mock.error_status)
+            else:
+                route(request)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled; a real server stops generating too.
+            self.close_connection = True
+        finally:
+            self.mock.end()
+
+    def generate(self, request):
+        self.complete(request, lambda token: {"response": token}, {"response": ""}, request.get("prompt"))
+
+    def chat(self, request):
+        self.complete(
+            request,
+            lambda token: {"message": {"role": "assistant", "content": token}},
+            {"message": {"role": "assistant", "content": ""}},
+            request.get("messages"),
+        )
+
+    def complete(self, request, token_chunk, final_chunk, prompt):
+        started = time.perf_counter()
+        model = request["model"]
+        load_duration = self.mock.load(model, request.get("keep_alive"))
+        base = {"model": model, "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+        if not prompt:
+            # Load (or keep_alive 0: unload) without generating.
+            self.send_json({**base, **final_chunk, "done": True,
+                            "done_reason": "unload" if request.get("keep_alive") in (0, "0", "0s") else "load",
+                            "load_duration": int(load_duration * 1e9),
+                            "total_duration": int((time.perf_counter() - started) * 1e9)})
+            return
+        time.sleep(self.mock.first_token_delay)
+        prompt_done = time.perf_counter()
+        num_predict = (request.get("options") or {}).get("num_predict")
+        stream = request.get("stream", True)
+        interval = self.mock.token_interval()
+        if stream:
+            self.start_stream()
+        parts = []
+        for i, token in enumerate(self.mock.tokens(num_predict)):
+            if i and interval:
+                time.sleep(interval)
+            parts.append(token)
+            if stream:
+                self.send_chunk({**base, **token_chunk(token), "done": False})
+        finished = time.perf_counter()
+        prompt_tokens = len(json.dumps(prompt)) // 4 + 1
+        final = {
+            **base,
+            **final_chunk,
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int((finished - started) * 1e9),
+            "load_duration": int(load_duration * 1e9),
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(self.mock.first_token_delay * 1e9),
+            "eval_count": len(parts),
+            "eval_duration": int((finished - prompt_done) * 1e9),
+        }
+        if "response" in final_chunk:
+            # Like Ollama: the conversation so far, extended by this exchange.
+            carried = request.get("context") or []
+            final["context"] = carried + list(range(len(carried), len(carried) + prompt_tokens + len(parts)))
+        if stream:
+            self.send_chunk(final)
+            self.end_stream()
+        else:
+            text = "".join(parts)
+            if "response" in final:
+                final["response"] = text
+            else:
+                final["message"] = {"role": "assistant", "content": text}
+            self.send_json(final)
+
+    def show(self, request):
+        name = request.get("name") or request.get("model")
+        if name not in self.mock.models:
+            self.send_json({"error": f"model '{name}' not found"}, 404)
+            return
+        self.send_json({"modelfile": "", "parameters": "", "details": {"family": "llama"},
+                        "model_info": {"general.architecture": "llama", "llama.context_length": self.mock.context_length}})
+
+    def embeddings(self, request):
+        self.send_json({"embedding": self.mock.embedding(request.get("prompt", ""))})
+
+    def pull(self, request):
+        name = request.get("name") or request.get("model")
+        total = 1024 * 1024 * self.mock.pull_steps
+        self.start_stream()
+        self.send_chunk({"status": "pulling manifest"})
+        for step in range(1, self.mock.pull_steps + 1):
+            time.sleep(self.mock.pull_delay)
+            self.send_chunk({"status": f"pulling {name}", "digest": "sha256:mock", "total": total,
+                             "completed": total * step // self.mock.pull_steps})
+        self.send_chunk({"status": "success"})
+        self.end_stream()
+        if name and name not in self.mock.models:
+            self.mock.models.append(name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--models", nargs="+", default=DEFAULT_MODELS)
+    parser.add_argument("--token-rate", type=float, default=50.0, help="tokens per second (0: unlimited)")
+    parser.add_argument("--first-token-delay", type=float, default=0.05, help="seconds")
+    parser.add_argument("--load-delay", type=float, default=0.5, help="seconds")
+    parser.add_argument("--response-tokens", type=int, default=64)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = MockOllamaServer(
+        models=args.models, token_rate=args.token_rate, first_token_delay=args.first_token_delay,
+        load_delay=args.load_delay, response_tokens=args.response_tokens, error_rate=args.error_rate,
+        error_status=args.error_status, seed=args.seed, host=args.host, port=args.port,
+    )
+    print(f"Mock Ollama listening on {server.start()} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,11 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
-from kb_manager import load_document_metadata, add_file, remove_file, rebuild_index
+try:
+    from kb.kb_manager import load_document_metadata, add_file, remove_file, rebuild_index
+except ImportError:
+    # Run standalone from the kb folder.
+    from kb_manager import load_document_metadata, add_file, remove_file, rebuild_index
 
 
 class KBGUI:
@@ -3,13 +3,15 @@ import os
 import json
 import shutil
 import datetime
-from local_retriever import build_index_from_folder, save_index, load_index
+from local_retriever import build_index_from_folder, chunk_folder, save_index, load_index
 
 # Define paths (modify as needed).
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 KB_FOLDER = os.path.join(BASE_DIR, "../local_kb")
 INDEX_FILE = os.path.join(BASE_DIR, "../faiss_index.index")
 METADATA_FILE = os.path.join(BASE_DIR, "../kb_documents.json")
+# Chunk texts and metadata in index order, saved next to the index.
+CHUNKS_FILE = os.path.join(BASE_DIR, "../kb_chunks.json")
 
 def ensure_kb_folder():
     if not os.path.exists(KB_FOLDER):
@@ -55,6 +57,20 @@ def remove_file(file_path):
         return True
     return False
 
+def save_chunks(chunks, meta):
+    with open(CHUNKS_FILE, "w", encoding="utf-8") as f:
+        json.dump({"chunks": chunks, "metadata": meta}, f)
+
+def load_chunks():
+    if not os.path.exists(CHUNKS_FILE):
+        return None, None
+    with open(CHUNKS_FILE, "r", encoding="utf-8") as f:
+        try:
+            stored = json.load(f)
+        except json.JSONDecodeError:
+            return None, None
+    return stored.get("chunks"), stored.get("metadata")
+
 def rebuild_index():
     """
     Rebuilds the FAISS index from all .txt files in the KB folder.
@@ -64,18 +80,23 @@ def rebuild_index():
     index, chunks, meta = build_index_from_folder(KB_FOLDER)
     if index is not None:
         save_index(index, INDEX_FILE)
+        save_chunks(chunks, meta)
     return index, chunks, meta
 
 def load_existing_index():
     """
-    Loads the FAISS index and returns it along with stored chunks and metadata.
-    For production, you might store chunks/metadata persistently as well.
-    Here we simply rebuild if no persistent storage for chunks exists.
+    Loads the FAISS index and returns it along with stored chunks and metadata,
+    without computing any embeddings. Chunks come from the file saved with the
+    index; indexes saved before that existed get theirs by re-chunking the KB
+    folder. Only if those do not line up with the index is it rebuilt.
     """
     if os.path.exists(INDEX_FILE):
         index = load_index(INDEX_FILE)
-        # For simplicity, rebuild chunks and metadata from the KB folder.
-        _, chunks, meta = build_index_from_folder(KB_FOLDER)
-        return index, chunks, meta
-    else:
-        return rebuild_index()
+        chunks, meta = load_chunks()
+        if chunks is None:
+            chunks, meta = chunk_folder(KB_FOLDER)
+        if index is not None and index.ntotal == len(chunks):
+            if not os.path.exists(CHUNKS_FILE):
+                save_chunks(chunks, meta)
+            return index, chunks, meta
+    return rebuild_index()
@@ -1,22 +1,27 @@
 # local_retriever.py
 import os
+import functools
 import faiss
 import numpy as np
 from sentence_transformers import SentenceTransformer
 
 
-def build_index_from_folder(kb_path, chunk_size=100, overlap=20, model_name="all-MiniLM-L6-v2"):
+@functools.lru_cache(maxsize=4)
+def get_embedding_model(model_name="all-MiniLM-L6-v2"):
     """
-    Reads all .txt files in kb_path, chunks their text, creates embeddings,
-    and builds a FAISS index along with lists for chunks and metadata.
+    Loads a SentenceTransformer once per process; loading takes seconds,
+    encoding a query takes milliseconds.
+    """
+    return SentenceTransformer(model_name)
 
-    :param kb_path: Folder containing text files.
-    :param chunk_size: Number of words per chunk.
-    :param overlap: Number of overlapping words between chunks.
-    :param model_name: Name of the SentenceTransformer model.
-    :return: index (FAISS index), chunks (list of text chunks), metadata (list of dicts)
+
+def chunk_folder(kb_path, chunk_size=100, overlap=20):
+    """
+    Reads all .txt files in kb_path and splits their text into overlapping
+    word chunks, in the order build_index_from_folder indexes them.
+
+    :return: chunks (list of text chunks), metadata (list of dicts)
     """
-    model = SentenceTransformer(model_name)
     chunks = []
     metadata = []
 
@@ -35,6 +40,22 @@ def build_index_from_folder(kb_path, chunk_size=100, overlap=20, model_name="all
                 metadata.append({"filename": filename, "chunk_index": chunk_index})
                 start += chunk_size - overlap
                 chunk_index += 1
+    return chunks, metadata
+
+
+def build_index_from_folder(kb_path, chunk_size=100, overlap=20, model_name="all-MiniLM-L6-v2"):
+    """
+    Reads all .txt files in kb_path, chunks their text, creates embeddings,
+    and builds a FAISS index along with lists for chunks and metadata.
+
+    :param kb_path: Folder containing text files.
+    :param chunk_size: Number of words per chunk.
+    :param overlap: Number of overlapping words between chunks.
+    :param model_name: Name of the SentenceTransformer model.
+    :return: index (FAISS index), chunks (list of text chunks), metadata (list of dicts)
+    """
+    model = get_embedding_model(model_name)
+    chunks, metadata = chunk_folder(kb_path, chunk_size, overlap)
 
     if not chunks:
         # No text found.
@@ -76,7 +97,7 @@ def search_index(query, index, chunks, metadata, top_k=3, model_name="all-MiniLM
     :param model_name: SentenceTransformer model name.
     :return: List of tuples (chunk, distance, metadata)
     """
-    model = SentenceTransformer(model_name)
+    model = get_embedding_model(model_name)
     query_emb = model.encode([query], convert_to_numpy=True)
     distances, indices = index.search(query_emb, top_k)
     results = []
@@ -0,0 +1,196 @@
+# batch.py
+"""
+Headless batch mode: answers a JSONL file of prompts through CoreManager
+and streams one JSON result per line as each answer completes.
+
+Input lines are objects with a "prompt" (or "message") and an optional
+"id"; a line that is not JSON is taken as the prompt itself. Items without
+an id are numbered by line. With --resume, ids that already have a
+successful result in the output file are skipped and the rest are
+appended, so an interrupted run can simply be started again.
+
+Examples (from the repository root):
+    python -m ollama.batch prompts.jsonl -o answers.jsonl --model llama3 --concurrency 4
+    cat prompts.txt | python -m ollama.batch - --web-search > answers.jsonl
+
+Imports no GUI toolkit, so it runs on servers without a display.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ollama.core.cancellation import CancellationToken
+from ollama.core.core_manager import CoreManager
+from ollama.core.scheduler import BATCH
+
+
+def read_items(stream):
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError:
+            item = line
+        if not isinstance(item, dict):
+            item = {"prompt": str(item)}
+        prompt = item.get("prompt", item.get("message"))
+        if not prompt:
+            continue
+        yield {"id": item.get("id", number), "prompt": prompt}
+
+
+def completed_ids(output_path):
+    # Ids with a successful result in an earlier run's output.
+    done = set()
+    if not output_path or output_path == "-" or not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut short by an interrupted run
+            if record.get("success"):
+                done.add(record.get("id"))
+    return done
+
+
+def configure(args):
+    core_manager = CoreManager(backends=args.backend, load_kb=args.kb)
+    for backend in core_manager.backend_pool.backends:
+        backend.scheduler.max_concurrent = args.concurrency
+    core_manager.web_search_enabled = args.web_search
+    core_manager.temperature = args.temperature
+    core_manager.num_predict = args.num_predict
+    if args.num_ctx:
+        core_manager.num_ctx = args.num_ctx
+    if args.system:
+        core_manager.system_prompt = args.system
+    if args.total_timeout:
+        core_manager.total_timeout = args.total_timeout
+    core_manager.warm_up_on_select = False
+    model = args.model
+    if not model:
+        models = core_manager.get_models()
+        if not models:
+            raise SystemExit("No models available; is Ollama running? Pass --model or --backend.")
+        model = models[0]
+    core_manager.set_model(model)
+    if args.kb:
+        # Answers should not depend on whether the index happened to be loaded yet.
+        while core_manager.kb.status in ("not loaded", "loading"):
+            time.sleep(0.1)
+    return core_manager
+
+
+def answer(core_manager, item, args, cancel_token):
+    started = time.perf_counter()
+    response = core_manager.generate_response(
+        item["prompt"], with_search=args.web_search, with_local_kb=args.kb,
+        cancel_token=cancel_token, priority=BATCH
+    )
+    return {
+        "id": item["id"],
+        "prompt": item["prompt"],
+        "model": core_manager.current_model,
+        "success": bool(response.get("success")),
+        "response": response.get("ai_response", ""),
+        "error": response.get("error"),
+        "latency": time.perf_counter() - started,
+        "metrics": response.get("metrics"),
+        "backend": response.get("backend"),
+    }
+
+
+def summarize(records, elapsed):
+    ok = [r for r in records if r["success"]]
+    lines = [f"{len(records)} prompts in {elapsed:.1f}s: {len(ok)} ok, {len(records) - len(ok)} failed"]
+    if ok:
+        latencies = sorted(r["latency"] for r in ok)
+        tokens = sum((r["metrics"] or {}).get("eval_count", 0) for r in ok)
+        lines.append(f"latency p50 {statistics.median(latencies):.2f}s  "
+                     f"p95 {latencies[int(0.95 * (len(latencies) - 1))]:.2f}s  "
+                     f"throughput {tokens / elapsed:.1f} tokens/s")
+    return "\n".join(lines)
+
+
+def run(args):
+    source = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    with source:
+        items = list(read_items(source))
+    done = completed_ids(args.output) if args.resume else set()
+    pending = [item for item in items if item["id"] not in done]
+    print(f"{len(items)} prompts, {len(items) - len(pending)} already answered", file=sys.stderr)
+    if not pending:
+        return 0
+
+    core_manager = configure(args)
+    if args.output == "-":
+        output = sys.stdout
+    else:
+        output = open(args.output, "a" if args.resume else "w", encoding="utf-8")
+    lock = threading.Lock()
+    tokens = {}
+    records = []
+
+    def work(item):
+        cancel_token = tokens[item["id"]] = CancellationToken()
+        record = answer(core_manager, item, args, cancel_token)
+        if cancel_token.cancelled:
+            return  # interrupted; left for the next --resume
+        with lock:
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+            records.append(record)
+
+    started = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=args.concurrency * len(core_manager.backend_pool.backends))
+    try:
+        for future in [executor.submit(work, item) for item in pending]:
+            future.result()
+    except KeyboardInterrupt:
+        print("Interrupted; rerun with --resume to continue.", file=sys.stderr)
+        executor.shutdown(wait=False, cancel_futures=True)
+        for cancel_token in list(tokens.values()):
+            cancel_token.cancel("Batch interrupted.")
+        return 130
+    finally:
+        executor.shutdown(wait=True)
+        if output is not sys.stdout:
+            output.close()
+        print(summarize(records, time.perf_counter() - started), file=sys.stderr)
+    return 0 if all(r["success"] for r in records) else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file of prompts, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSONL results file (default: stdout)")
+    parser.add_argument("--resume", action="store_true", help="skip ids already answered in --output and append")
+    parser.add_argument("--model", help="model name (default: the first installed model)")
+    parser.add_argument("--backend", action="append", help="Ollama URL; repeat for several servers")
+    parser.add_argument("--concurrency", type=int, default=2, help="requests in flight per backend")
+    parser.add_argument("--web-search", action="store_true", help="add web search results to each prompt")
+    parser.add_argument("--kb", action="store_true", help="add local knowledge base results to each prompt")
+    parser.add_argument("--temperature", type=float, default=0.7)
+    parser.add_argument("--num-predict", type=int, default=2048)
+    parser.add_argument("--num-ctx", type=int, help="context window (default: CoreManager's)")
+    parser.add_argument("--system", help="system text for every prompt")
+    parser.add_argument("--total-timeout", type=float, help="seconds allowed per answer")
+    args = parser.parse_args(argv)
+    if args.output == "-" and args.resume:
+        parser.error("--resume needs an --output file")
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,40 +1,338 @@
 import requests
 import datetime
+import json
+import socket
+import threading
+import time
 
-def get_models(ollama_url):
+from urllib3.exceptions import ReadTimeoutError
+
+from .cancellation import CancellationToken
+from .client import get_client
+from .scheduler import BATCH, INTERACTIVE, WARMUP, get_scheduler
+
+# Error messages that mean the backend itself failed (see backend_pool.py).
+CONNECTION_ERROR = "Cannot connect to Ollama server. Is it running?"
+TIMEOUT_ERROR = "Ollama server timed out."
+
+# Calls that make the server load or run a model go through the backend's
+# RequestScheduler (see scheduler.py). /api/tags is answered from metadata
+# without touching the runner, so health checks and model lists are not
+# queued behind long generations.
+
+def fetch_tags(ollama_url, timeout=5):
+    """
+    One /api/tags round-trip. Returns (online, model_names); the model list is
+    empty when the server is unreachable or answers with an error.
+    """
     try:
-        response = requests.get(f"{ollama_url}/api/tags", timeout=5)
+        response = get_client(ollama_url).get("/api/tags", timeout=timeout)
         if response.status_code == 200:
             models = response.json().get("models", [])
-            return [m["name"] for m in models]
-        return []
+            return True, [m["name"] for m in models]
+        return False, []
     except Exception:
-        return []
+        return False, []
+
+def get_models(ollama_url):
+    return fetch_tags(ollama_url, timeout=5)[1]
 
 def check_server_connection(ollama_url):
     try:
-        response = requests.get(f"{ollama_url}/api/tags", timeout=3)
+        response = get_client(ollama_url).get("/api/tags", timeout=3)
         return response.status_code == 200
     except Exception:
         return False
 
-def generate_response(ollama_url, model, prompt, temperature=0.7, num_predict=2048):
-    try:
-        response = requests.post(
-            f"{ollama_url}/api/generate",
-            json={
-                "model": model,
-                "prompt": prompt,
-                "stream": False,
-                "options": {"temperature": temperature, "num_predict": num_predict},
-            },
-        )
+def generate_payload(model, prompt, temperature=0.7, num_predict=2048, stream=False, context=None,
+                     keep_alive=None, num_ctx=None):
+    # Request body for /api/generate, shared with async_api. context is the
+    # token array returned by the previous turn; sending it back lets the
+    # server reuse its KV cache instead of re-evaluating the conversation.
+    # keep_alive ("30m", seconds, -1 forever, 0 unload) overrides how long the
+    # server keeps the model resident after this request. num_ctx sets the
+    # context window; it must match the warm-up request or the model reloads.
+    payload = {
+        "model": model,
+        "prompt": prompt,
+        "stream": stream,
+        "options": {"temperature": temperature, "num_predict": num_predict},
+    }
+    if context:
+        payload["context"] = context
+    if keep_alive is not None:
+        payload["keep_alive"] = keep_alive
+    if num_ctx:
+        payload["options"]["num_ctx"] = num_ctx
+    return payload
+
+def get_context_length(ollama_url, model, timeout=5):
+    """
+    The context length model was trained with, from /api/show, or None if
+    the server does not say. Metadata only, so not scheduled.
+    """
+    try:
+        response = get_client(ollama_url).post("/api/show", json={"name": model}, timeout=timeout)
+        if response.status_code == 200:
+            model_info = response.json().get("model_info") or {}
+            for key, value in model_info.items():
+                if key.endswith(".context_length"):
+                    return int(value)
+    except Exception:
+        pass
+    return None
+
+def parse_metrics(data, model=None, latency=None, first_token=None):
+    """
+    Metrics record for one /api/generate call, built from the final response
+    object (Ollama reports durations in nanoseconds; these are seconds).
+    latency and first_token are measured by the client from the start of the
+    call, so they include time queued in the scheduler and on the network.
+    Without a measured first token (non-streaming calls) it is estimated as
+    everything before decoding started. Rates the server did not report are None.
+    """
+    ns = 1e9
+    eval_count = data.get("eval_count", 0)
+    eval_duration = data.get("eval_duration", 0) / ns
+    prompt_eval_count = data.get("prompt_eval_count", 0)
+    prompt_eval_duration = data.get("prompt_eval_duration", 0) / ns
+    if first_token is None and latency is not None:
+        first_token = max(latency - eval_duration, 0.0)
+    return {
+        "model": data.get("model") or model,
+        "total_duration": data.get("total_duration", 0) / ns,
+        "load_duration": data.get("load_duration", 0) / ns,
+        "prompt_eval_count": prompt_eval_count,
+        "prompt_eval_duration": prompt_eval_duration,
+        "eval_count": eval_count,
+        "eval_duration": eval_duration,
+        "prompt_tokens_per_second": prompt_eval_count / prompt_eval_duration if prompt_eval_duration else None,
+        "tokens_per_second": eval_count / eval_duration if eval_duration else None,
+        "latency": latency,
+        "time_to_first_token": first_token,
+    }
+
+def load_payload(model, keep_alive, num_ctx=None):
+    payload = {"model": model, "stream": False, "keep_alive": keep_alive}
+    if num_ctx:
+        payload["options"] = {"num_ctx": num_ctx}
+    return payload
+
+def load_model(ollama_url, model, keep_alive="5m", priority=WARMUP, num_ctx=None):
+    """
+    Loads model into memory without generating anything (a request with no
+    prompt) and keeps it resident for keep_alive. Returns the server's
+    load_duration in seconds.
+    """
+    try:
+        with get_scheduler(ollama_url).slot(priority):
+            response = get_client(ollama_url).post("/api/generate", json=load_payload(model, keep_alive, num_ctx))
         if response.status_code == 200:
-            ai_response = response.json().get("response", "")
-            return {"success": True, "ai_response": ai_response}
+            load_duration = response.json().get("load_duration", 0) / 1e9
+            return {"success": True, "load_duration": load_duration}
+        return {"success": False, "error": f"Server error: {response.status_code}"}
+    except requests.exceptions.ConnectionError:
+        return {"success": False, "error": CONNECTION_ERROR}
+    except Exception as e:
+        return {"success": False, "error": f"Error: {str(e)}"}
+
+def unload_model(ollama_url, model):
+    return load_model(ollama_url, model, keep_alive=0)
+
+def pull_model(ollama_url, name, priority=BATCH):
+    """
+    Downloads a model, yielding /api/pull progress records as dicts.
+    Raises RuntimeError on a non-200 status.
+    """
+    with get_scheduler(ollama_url).slot(priority):
+        with get_client(ollama_url).post("/api/pull", json={"name": name}, stream=True) as response:
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code}")
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+def cancelled_result(reason, parts):
+    return {"success": False, "cancelled": True, "error": reason or "Cancelled.", "ai_response": "".join(parts)}
+
+def _abort_connection(conn, retries=60):
+    # Shutting the socket down wakes a thread blocked reading it; close()
+    # alone only takes effect once the next chunk arrives. A connection still
+    # connecting has no socket yet, so try again shortly (up to ~3s, the
+    # client's connect timeout).
+    sock = getattr(conn, "sock", None)
+    if sock is None:
+        if retries:
+            timer = threading.Timer(0.05, _abort_connection, args=(conn, retries - 1))
+            timer.daemon = True
+            timer.start()
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+def _abort_response(response):
+    conn = getattr(response.raw, "_connection", None)
+    if conn is not None:
+        _abort_connection(conn, retries=0)
+    response.close()
+
+def stream_response(ollama_url, model, prompt, temperature=0.7, num_predict=2048, context=None, keep_alive=None,
+                    cancel_token=None, first_token_timeout=None, priority=INTERACTIVE, num_ctx=None):
+    """
+    Yields the NDJSON chunks of a streaming /api/generate call as dicts, in the
+    order Ollama produces them. The last chunk has "done": True.
+    Raises requests exceptions on connection problems and RuntimeError on a
+    non-200 status or an in-stream error.
+
+    first_token_timeout bounds the wait for response headers (Ollama sends
+    them with the first token) and for each later chunk. Cancelling
+    cancel_token closes the connection, which makes Ollama stop generating;
+    the generator then simply ends. That holds at every stage: queued in the
+    scheduler, connecting, waiting for the headers during prompt evaluation,
+    or streaming.
+    """
+    with get_scheduler(ollama_url).slot(priority, cancel_token) as admitted:
+        if admitted:
+            yield from _stream_admitted(ollama_url, model, prompt, temperature, num_predict, context, keep_alive,
+                                        cancel_token, first_token_timeout, num_ctx)
+
+def _stream_admitted(ollama_url, model, prompt, temperature, num_predict, context, keep_alive, cancel_token,
+                     first_token_timeout, num_ctx=None):
+    client = get_client(ollama_url)
+    # post() only returns once the headers arrive, with the first token, so
+    # until then a cancel has to shut down the connection itself.
+    in_flight = {"conn": None, "response": None}
+
+    def abort():
+        if in_flight["response"] is not None:
+            _abort_response(in_flight["response"])
+        elif in_flight["conn"] is not None:
+            _abort_connection(in_flight["conn"])
+
+    unregister = cancel_token.on_cancel(abort) if cancel_token else None
+    response = None
+    try:
+        if cancel_token is not None and cancel_token.cancelled:
+            return
+        with client.watch_connections(lambda conn: in_flight.__setitem__("conn", conn)):
+            response = client.post(
+                "/api/generate",
+                json=generate_payload(model, prompt, temperature, num_predict, stream=True, context=context,
+                                      keep_alive=keep_alive, num_ctx=num_ctx),
+                stream=True,
+                timeout=first_token_timeout,
+            )
+        in_flight["response"] = response
+        if cancel_token is not None and cancel_token.cancelled:
+            return
+        if response.status_code != 200:
+            raise RuntimeError(f"Server error: {response.status_code}")
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if "error" in chunk:
+                raise RuntimeError(chunk["error"])
+            yield chunk
+            if chunk.get("done"):
+                break
+    except Exception as e:
+        if cancel_token is not None and cancel_token.cancelled:
+            return
+        # requests reports a read timeout mid-body as a ConnectionError.
+        if isinstance(e, requests.exceptions.ConnectionError) and e.args and isinstance(e.args[0], ReadTimeoutError):
+            raise requests.exceptions.ReadTimeout(e) from e
+        raise
+    finally:
+        if unregister:
+            unregister()
+        if response is not None:
+            response.close()
+
+def generate_response(ollama_url, model, prompt, temperature=0.7, num_predict=2048, on_token=None, context=None,
+                      keep_alive=None, cancel_token=None, first_token_timeout=None, total_timeout=None,
+                      priority=INTERACTIVE, num_ctx=None):
+    """
+    Runs a completion. Without on_token the whole answer is requested in one
+    non-streaming call; with on_token the answer is streamed and on_token(text)
+    is called for every fragment as it arrives. Either way the full answer is
+    returned in "ai_response", the conversation's new token context in
+    "context" (pass it back on the next turn) and a parse_metrics() record in
+    "metrics".
+
+    With a cancel_token or a deadline the request is always streamed, so it
+    can be stopped at any point, including before the first token:
+    cancel_token.cancel() or exceeding total_timeout closes the connection
+    and returns "cancelled": True with the partial answer.
+    """
+    if on_token is not None or cancel_token is not None or total_timeout is not None:
+        return _generate_streaming(ollama_url, model, prompt, temperature, num_predict, on_token, context,
+                                   keep_alive, cancel_token, first_token_timeout, total_timeout, priority, num_ctx)
+    started = time.perf_counter()
+    try:
+        with get_scheduler(ollama_url).slot(priority):
+            response = get_client(ollama_url).post(
+                "/api/generate",
+                json=generate_payload(model, prompt, temperature, num_predict, context=context,
+                                      keep_alive=keep_alive, num_ctx=num_ctx),
+                timeout=first_token_timeout,
+            )
+        if response.status_code == 200:
+            data = response.json()
+            metrics = parse_metrics(data, model, latency=time.perf_counter() - started)
+            return {"success": True, "ai_response": data.get("response", ""), "context": data.get("context"),
+                    "metrics": metrics}
         else:
             return {"success": False, "error": f"Server error: {response.status_code}"}
     except requests.exceptions.ConnectionError:
-        return {"success": False, "error": "Cannot connect to Ollama server. Is it running?"}
+        return {"success": False, "error": CONNECTION_ERROR}
+    except requests.exceptions.Timeout:
+        return {"success": False, "error": TIMEOUT_ERROR}
     except Exception as e:
         return {"success": False, "error": f"Error: {str(e)}"}
+
+def _generate_streaming(ollama_url, model, prompt, temperature, num_predict, on_token, context, keep_alive,
+                        cancel_token=None, first_token_timeout=None, total_timeout=None, priority=INTERACTIVE,
+                        num_ctx=None):
+    parts = []
+    new_context = None
+    metrics = None
+    started = time.perf_counter()
+    first_token = None
+    if cancel_token is None:
+        cancel_token = CancellationToken()
+    deadline = None
+    if total_timeout is not None:
+        deadline = threading.Timer(total_timeout, cancel_token.cancel,
+                                   args=(f"No complete answer within {total_timeout} seconds.",))
+        deadline.daemon = True
+        deadline.start()
+    try:
+        if cancel_token.cancelled:
+            return cancelled_result(cancel_token.reason, parts)
+        for chunk in stream_response(ollama_url, model, prompt, temperature, num_predict, context, keep_alive,
+                                     cancel_token, first_token_timeout, priority, num_ctx):
+            token = chunk.get("response", "")
+            if token:
+                if first_token is None:
+                    first_token = time.perf_counter() - started
+                parts.append(token)
+                if on_token is not None:
+                    on_token(token)
+            if chunk.get("done"):
+                new_context = chunk.get("context")
+                metrics = parse_metrics(chunk, model, time.perf_counter() - started, first_token)
+        if cancel_token.cancelled:
+            return cancelled_result(cancel_token.reason, parts)
+        return {"success": True, "ai_response": "".join(parts), "context": new_context, "metrics": metrics}
+    except requests.exceptions.ConnectionError:
+        return {"success": False, "error": CONNECTION_ERROR, "ai_response": "".join(parts)}
+    except requests.exceptions.Timeout:
+        return {"success": False, "error": TIMEOUT_ERROR, "ai_response": "".join(parts)}
+    except Exception as e:
+        return {"success": False, "error": f"Error: {str(e)}", "ai_response": "".join(parts)}
+    finally:
+        if deadline is not None:
+            deadline.cancel()
@@ -0,0 +1,254 @@
+import asyncio
+import json
+import threading
+import time
+import weakref
+
+import aiohttp
+
+from .api import CONNECTION_ERROR, TIMEOUT_ERROR, cancelled_result, generate_payload, load_payload, parse_metrics
+from .cancellation import CancellationToken
+from .client import DEFAULT_CONNECT_TIMEOUT, DEFAULT_POOL_SIZE, DEFAULT_READ_TIMEOUT
+from .scheduler import INTERACTIVE, WARMUP, get_scheduler
+
+
+class EventLoopThread:
+    """
+    One long-lived asyncio event loop running in a daemon thread.
+    Other threads (the Tk main loop, CoreManager callers) hand it coroutines
+    with submit() and get a concurrent.futures.Future back.
+    """
+
+    def __init__(self, name="ollama-async"):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call_soon(self, callback, *args):
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def stop(self):
+        self.submit(close_sessions()).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+_loop_thread = None
+_loop_thread_lock = threading.Lock()
+
+
+def get_event_loop_thread():
+    global _loop_thread
+    with _loop_thread_lock:
+        if _loop_thread is None:
+            _loop_thread = EventLoopThread()
+        return _loop_thread
+
+
+def submit(coro):
+    return get_event_loop_thread().submit(coro)
+
+
+# aiohttp sessions are bound to the loop that created them, so keep one
+# pooled session per (loop, base URL).
+_sessions = weakref.WeakKeyDictionary()
+
+
+def get_session(ollama_url, pool_size=DEFAULT_POOL_SIZE):
+    loop = asyncio.get_running_loop()
+    loop_sessions = _sessions.setdefault(loop, {})
+    session = loop_sessions.get(ollama_url)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            base_url=ollama_url,
+            connector=aiohttp.TCPConnector(limit=pool_size),
+        )
+        loop_sessions[ollama_url] = session
+    return session
+
+
+async def close_sessions():
+    loop_sessions = _sessions.pop(asyncio.get_running_loop(), {})
+    for session in loop_sessions.values():
+        await session.close()
+
+
+def _timeout(read_timeout=DEFAULT_READ_TIMEOUT):
+    return aiohttp.ClientTimeout(total=None, connect=DEFAULT_CONNECT_TIMEOUT, sock_read=read_timeout)
+
+
+async def get_models(ollama_url):
+    try:
+        async with get_session(ollama_url).get("/api/tags", timeout=_timeout(5)) as response:
+            if response.status == 200:
+                models = (await response.json(content_type=None)).get("models", [])
+                return [m["name"] for m in models]
+            return []
+    except Exception:
+        return []
+
+
+async def check_server_connection(ollama_url):
+    try:
+        async with get_session(ollama_url).get("/api/tags", timeout=_timeout(3)) as response:
+            return response.status == 200
+    except Exception:
+        return False
+
+
+async def load_model(ollama_url, model, keep_alive="5m", priority=WARMUP, num_ctx=None):
+    """
+    Coroutine version of api.load_model. The read timeout is the client's
+    long default because loading a large model can take a while.
+    """
+    payload = load_payload(model, keep_alive, num_ctx)
+    try:
+        async with get_scheduler(ollama_url).async_slot(priority):
+            async with get_session(ollama_url).post("/api/generate", json=payload, timeout=_timeout()) as response:
+                if response.status == 200:
+                    data = await response.json(content_type=None)
+                    return {"success": True, "load_duration": data.get("load_duration", 0) / 1e9}
+                return {"success": False, "error": f"Server error: {response.status}"}
+    except aiohttp.ClientConnectionError:
+        return {"success": False, "error": CONNECTION_ERROR}
+    except Exception as e:
+        return {"success": False, "error": f"Error: {str(e)}"}
+
+
+async def unload_model(ollama_url, model):
+    return await load_model(ollama_url, model, keep_alive=0)
+
+
+async def stream_response(ollama_url, model, prompt, temperature=0.7, num_predict=2048, context=None,
+                          keep_alive=None, first_token_timeout=None, priority=INTERACTIVE, num_ctx=None):
+    """
+    Async generator over the NDJSON chunks of a streaming /api/generate call.
+    Same contract as api.stream_response; cancel by cancelling the consuming
+    task, which closes the connection (or leaves the scheduler queue).
+    """
+    payload = generate_payload(model, prompt, temperature, num_predict, stream=True, context=context,
+                               keep_alive=keep_alive, num_ctx=num_ctx)
+    timeout = _timeout(first_token_timeout) if first_token_timeout is not None else _timeout()
+    async with get_scheduler(ollama_url).async_slot(priority), \
+            get_session(ollama_url).post("/api/generate", json=payload, timeout=timeout) as response:
+        try:
+            if response.status != 200:
+                raise RuntimeError(f"Server error: {response.status}")
+            async for line in response.content:
+                line = line.strip()
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise RuntimeError(chunk["error"])
+                yield chunk
+                if chunk.get("done"):
+                    break
+        except BaseException:
+            # Drop the connection instead of returning it to the pool half-read,
+            # so the server notices and stops generating.
+            response.close()
+            raise
+
+
+async def generate_response(ollama_url, model, prompt, temperature=0.7, num_predict=2048, on_token=None,
+                            context=None, keep_alive=None, cancel_token=None, first_token_timeout=None,
+                            total_timeout=None, priority=INTERACTIVE, num_ctx=None):
+    """
+    Coroutine version of api.generate_response. on_token is called on the
+    event loop thread. cancel_token may be cancelled from any thread.
+    """
+    if on_token is not None or cancel_token is not None or total_timeout is not None:
+        return await _generate_cancellable(ollama_url, model, prompt, temperature, num_predict, on_token, context,
+                                           keep_alive, cancel_token, first_token_timeout, total_timeout, priority,
+                                           num_ctx)
+    payload = generate_payload(model, prompt, temperature, num_predict, context=context, keep_alive=keep_alive,
+                               num_ctx=num_ctx)
+    timeout = _timeout(first_token_timeout) if first_token_timeout is not None else _timeout()
+    started = time.perf_counter()
+    try:
+        async with get_scheduler(ollama_url).async_slot(priority), \
+                get_session(ollama_url).post("/api/generate", json=payload, timeout=timeout) as response:
+            if response.status == 200:
+                data = await response.json(content_type=None)
+                metrics = parse_metrics(data, model, latency=time.perf_counter() - started)
+                return {"success": True, "ai_response": data.get("response", ""), "context": data.get("context"),
+                        "metrics": metrics}
+            else:
+                return {"success": False, "error": f"Server error: {response.status}"}
+    except aiohttp.ServerTimeoutError:
+        return {"success": False, "error": TIMEOUT_ERROR}
+    except aiohttp.ClientConnectionError:
+        return {"success": False, "error": CONNECTION_ERROR}
+    except asyncio.TimeoutError:
+        return {"success": False, "error": TIMEOUT_ERROR}
+    except Exception as e:
+        return {"success": False, "error": f"Error: {str(e)}"}
+
+
+async def _generate_cancellable(ollama_url, model, prompt, temperature, num_predict, on_token, context, keep_alive,
+                                cancel_token, first_token_timeout, total_timeout, priority=INTERACTIVE, num_ctx=None):
+    # Runs the stream in its own task so a cancel from another thread (or the
+    # total deadline) can cancel just the HTTP exchange and still report the
+    # partial answer.
+    if cancel_token is None:
+        cancel_token = CancellationToken()
+    loop = asyncio.get_running_loop()
+    parts = []
+    stream_task = loop.create_task(_generate_streaming(
+        ollama_url, model, prompt, temperature, num_predict, on_token, context, keep_alive,
+        first_token_timeout, parts, priority, num_ctx
+    ))
+    unregister = cancel_token.on_cancel(lambda: loop.call_soon_threadsafe(stream_task.cancel))
+    deadline = None
+    if total_timeout is not None:
+        deadline = loop.call_later(total_timeout, cancel_token.cancel,
+                                   f"No complete answer within {total_timeout} seconds.")
+    try:
+        return await stream_task
+    except asyncio.CancelledError:
+        if cancel_token.cancelled:
+            return cancelled_result(cancel_token.reason, parts)
+        raise
+    finally:
+        unregister()
+        if deadline is not None:
+            deadline.cancel()
+
+
+async def _generate_streaming(ollama_url, model, prompt, temperature, num_predict, on_token, context, keep_alive,
+                              first_token_timeout=None, parts=None, priority=INTERACTIVE, num_ctx=None):
+    parts = [] if parts is None else parts
+    new_context = None
+    metrics = None
+    started = time.perf_counter()
+    first_token = None
+    try:
+        async for chunk in stream_response(ollama_url, model, prompt, temperature, num_predict, context,
+                                           keep_alive, first_token_timeout, priority, num_ctx):
+            token = chunk.get("response", "")
+            if token:
+                if first_token is None:
+                    first_token = time.perf_counter() - started
+                parts.append(token)
+                if on_token is not None:
+                    on_token(token)
+            if chunk.get("done"):
+                new_context = chunk.get("context")
+                metrics = parse_metrics(chunk, model, time.perf_counter() - started, first_token)
+        return {"success": True, "ai_response": "".join(parts), "context": new_context, "metrics": metrics}
+    except aiohttp.ServerTimeoutError:
+        return {"success": False, "error": TIMEOUT_ERROR, "ai_response": "".join(parts)}
+    except aiohttp.ClientConnectionError:
+        return {"success": False, "error": CONNECTION_ERROR, "ai_response": "".join(parts)}
+    except asyncio.TimeoutError:
+        return {"success": False, "error": TIMEOUT_ERROR, "ai_response": "".join(parts)}
+    except Exception as e:
+        return {"success": False, "error": f"Error: {str(e)}", "ai_response": "".join(parts)}
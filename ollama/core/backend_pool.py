@@ -0,0 +1,271 @@
+import asyncio
+import threading
+import time
+
+from .api import CONNECTION_ERROR, TIMEOUT_ERROR
+from .model_registry import get_registry
+from .scheduler import get_scheduler
+
+
+class Backend:
+    """One Ollama server in a BackendPool and its routing state."""
+
+    def __init__(self, ollama_url, registry, scheduler):
+        self.ollama_url = ollama_url
+        self.registry = registry
+        self.scheduler = scheduler
+        # Moving average of time to first token, including time queued here.
+        self.latency = None
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.requests = 0
+
+    def ejected(self, now=None):
+        return (now if now is not None else time.monotonic()) < self.ejected_until
+
+    def serves(self, model):
+        # Unknown until /api/tags answers; whether it is up is the ejection's business.
+        models = self.registry.cached_models()
+        return not model or not models or model in models
+
+
+class BackendPool:
+    """
+    Routes requests over several Ollama servers. Each request goes to a
+    non-ejected backend that has the model, picking the one with the fewest
+    outstanding requests (running or queued in its scheduler) and breaking
+    ties by the lower average time to first token.
+
+    Health is tracked passively (max_failures consecutive failed requests
+    eject a backend for eject_seconds) and actively (start_health_checks()
+    polls every backend's /api/tags each health_interval seconds, ejecting
+    ones that are down and reinstating ones that are back).
+
+    The pool also stands in for a ModelRegistry: its model list is the union
+    of all backends' lists and it is online while any backend is.
+    """
+
+    def __init__(self, ollama_urls, ttl=30, max_concurrent=2, max_failures=3, eject_seconds=30,
+                 health_interval=15, latency_smoothing=0.3):
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.health_interval = health_interval
+        self.latency_smoothing = latency_smoothing
+        self.backends = [
+            Backend(url.rstrip("/"), get_registry(url, ttl=ttl), get_scheduler(url, max_concurrent=max_concurrent))
+            for url in ollama_urls
+        ]
+        self.models = []
+        self.online = None
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._health_thread = None
+        self._stop = None
+        for backend in self.backends:
+            backend.registry.subscribe(self._on_backend_changed)
+        self._merge()
+
+    # ModelRegistry interface, aggregated over all backends.
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def cached_models(self):
+        return list(self.models)
+
+    def get_models(self, max_age=None):
+        for backend in self.backends:
+            backend.registry.get_models(max_age)
+        return list(self.models)
+
+    def check_server_connection(self, max_age=None):
+        return any([backend.registry.check_server_connection(max_age) for backend in self.backends])
+
+    def refresh_in_background(self, force=False):
+        for backend in self.backends:
+            backend.registry.refresh_in_background(force=force)
+
+    def _merge(self):
+        models = []
+        for backend in self.backends:
+            models.extend(m for m in backend.registry.cached_models() if m not in models)
+        states = [backend.registry.online for backend in self.backends]
+        online = True if any(states) else (None if None in states else False)
+        with self._lock:
+            changed = models != self.models or online != self.online
+            self.models = models
+            self.online = online
+            subscribers = list(self._subscribers) if changed else []
+        return models, online, subscribers
+
+    def _on_backend_changed(self, models, online):
+        models, online, subscribers = self._merge()
+        for callback in subscribers:
+            callback(list(models), online)
+
+    # Routing.
+
+    def backends_for(self, model):
+        # Backends listing model; all of them if none does, so a server
+        # answers for a model it really lacks (with a 404).
+        serving = [backend for backend in self.backends if backend.serves(model)]
+        return serving or list(self.backends)
+
+    def is_listed(self, model):
+        return any(backend.serves(model) for backend in self.backends)
+
+    def refresh_models(self):
+        # Blocking /api/tags round-trip on every backend, ignoring the cache.
+        for backend in self.backends:
+            backend.registry.get_models(max_age=0)
+
+    def pick(self, model, exclude=()):
+        """
+        Returns the Backend to send a request for model to, or None if every
+        backend is in exclude. When every candidate is ejected the one whose
+        ejection ends first is tried anyway rather than failing.
+        """
+        now = time.monotonic()
+        candidates = [b for b in self.backends_for(model) if b.ollama_url not in exclude]
+        if not candidates:
+            return None
+        healthy = [b for b in candidates if not b.ejected(now)]
+        if not healthy:
+            return min(candidates, key=lambda b: b.ejected_until)
+        return min(healthy, key=lambda b: (b.scheduler.outstanding(), b.latency or 0.0))
+
+    def report_success(self, backend, latency=None):
+        with self._lock:
+            backend.requests += 1
+            backend.failures = 0
+            backend.ejected_until = 0.0
+            if latency is not None:
+                if backend.latency is None:
+                    backend.latency = latency
+                else:
+                    backend.latency += self.latency_smoothing * (latency - backend.latency)
+
+    def report_failure(self, backend):
+        with self._lock:
+            backend.requests += 1
+            backend.failures += 1
+            eject = backend.failures >= self.max_failures
+            if eject:
+                backend.ejected_until = time.monotonic() + self.eject_seconds
+        if eject:
+            backend.registry.refresh_in_background(force=True)
+
+    @staticmethod
+    def is_backend_failure(result):
+        # The server was unreachable, timed out or answered 5xx, as opposed to
+        # a cancelled request or a model-level error.
+        error = result.get("error") or ""
+        return not result.get("success") and not result.get("cancelled") and (
+            # Streaming calls report a bad status as "Error: Server error: 5xx".
+            error in (CONNECTION_ERROR, TIMEOUT_ERROR) or "Server error: 5" in error
+        )
+
+    @staticmethod
+    def is_retryable(result):
+        # Generating is side-effect free, so a request that failed before any
+        # token reached the caller can safely be repeated elsewhere. Timeouts
+        # are not retried: the first server may still be working on it.
+        return result.get("error") != TIMEOUT_ERROR and not result.get("ai_response")
+
+    def _no_backend(self, model):
+        return {"success": False, "error": f"No available Ollama backend has model {model}."}
+
+    def _settle(self, backend, result):
+        result["backend"] = backend.ollama_url
+        if result.get("cancelled"):
+            return True
+        if self.is_backend_failure(result):
+            self.report_failure(backend)
+            return False
+        metrics = result.get("metrics") or {}
+        self.report_success(backend, metrics.get("time_to_first_token"))
+        return True
+
+    def call(self, model, request, retry=True):
+        """
+        Runs request(ollama_url) -> result dict (the api.* convention) on the
+        best backend for model. If that backend fails before producing
+        output, the request is retried once on each other backend.
+
+        A model no backend lists makes the pool refetch the model lists first
+        (it may have been pulled since they were cached).
+        """
+        if not self.is_listed(model):
+            self.refresh_models()
+        tried = []
+        result = None
+        while True:
+            backend = self.pick(model, exclude=tried)
+            if backend is None:
+                return result or self._no_backend(model)
+            result = request(backend.ollama_url)
+            if self._settle(backend, result) or not retry or not self.is_retryable(result):
+                return result
+            tried.append(backend.ollama_url)
+
+    async def acall(self, model, request, retry=True):
+        # Coroutine version of call(); request(ollama_url) returns an awaitable.
+        if not self.is_listed(model):
+            await asyncio.get_running_loop().run_in_executor(None, self.refresh_models)
+        tried = []
+        result = None
+        while True:
+            backend = self.pick(model, exclude=tried)
+            if backend is None:
+                return result or self._no_backend(model)
+            result = await request(backend.ollama_url)
+            if self._settle(backend, result) or not retry or not self.is_retryable(result):
+                return result
+            tried.append(backend.ollama_url)
+
+    # Active health checks.
+
+    def check_health(self):
+        for backend in self.backends:
+            online = backend.registry.check_server_connection(max_age=0)
+            with self._lock:
+                if online and backend.ejected():
+                    backend.ejected_until = 0.0
+                    backend.failures = 0
+                elif not online:
+                    backend.ejected_until = time.monotonic() + self.eject_seconds
+
+    def start_health_checks(self):
+        if self._health_thread is not None:
+            return
+        self._stop = threading.Event()
+        self._health_thread = threading.Thread(target=self._health_loop, args=(self._stop,), name="ollama-health",
+                                               daemon=True)
+        self._health_thread.start()
+
+    def stop_health_checks(self):
+        if self._stop is not None:
+            self._stop.set()
+        self._health_thread = None
+
+    def _health_loop(self, stop):
+        while not stop.wait(self.health_interval):
+            self.check_health()
+
+    def status(self):
+        now = time.monotonic()
+        return [{
+            "url": backend.ollama_url,
+            "online": backend.registry.online,
+            "ejected": backend.ejected(now),
+            "outstanding": backend.scheduler.outstanding(),
+            "latency": backend.latency,
+            "failures": backend.failures,
+            "requests": backend.requests,
+        } for backend in self.backends]
@@ -0,0 +1,134 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def get_cache_dir():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    cache_dir = os.path.join(base_dir, "cache")
+    if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir)
+    return cache_dir
+
+
+class LRUDiskCache:
+    """
+    Key/value cache with an in-memory LRU in front of an SQLite file.
+    Values must be JSON-serialisable. Entries older than max_age seconds are
+    treated as missing and purged; past max_disk_entries the least recently
+    used rows are evicted.
+
+    Lookups served from memory do not touch SQLite: access times are kept in
+    memory and written in one batch with the next put, or once
+    access_flush_every of them have piled up.
+    """
+
+    def __init__(self, path, max_memory_entries=256, max_disk_entries=5000, max_age=7 * 24 * 3600):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.max_age = max_age
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        self._db.commit()
+        self._writes = 0
+        self._accessed = {}
+        self.access_flush_every = 100
+
+    def get(self, key, max_age=None):
+        """
+        Returns (value, age_seconds), or (None, None) on a miss. max_age
+        overrides the cache's own limit for this lookup.
+        """
+        max_age = self.max_age if max_age is None else max_age
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                row = self._db.execute(
+                    "SELECT value, created FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None, None
+                entry = (json.loads(row[0]), row[1])
+            value, created = entry
+            if now - created > max_age:
+                return None, None
+            self._remember(key, entry)
+            self._accessed[key] = now
+            if len(self._accessed) >= self.access_flush_every:
+                self._flush_accessed()
+                self._db.commit()
+            return value, now - created
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._remember(key, (value, now))
+            self._accessed.pop(key, None)
+            self._flush_accessed()
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            self._writes += 1
+            # Eviction scans the table, so only run it every so often.
+            if self._writes % 50 == 1:
+                self._evict(now)
+            self._db.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._memory.pop(key, None)
+            self._accessed.pop(key, None)
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._accessed.clear()
+            self._db.execute("DELETE FROM entries")
+            self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._flush_accessed()
+            self._db.commit()
+            self._db.close()
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _flush_accessed(self):
+        # Caller holds the lock and commits.
+        if self._accessed:
+            self._db.executemany("UPDATE entries SET accessed = ? WHERE key = ?",
+                                 [(accessed, key) for key, accessed in self._accessed.items()])
+            self._accessed.clear()
+
+    def _evict(self, now):
+        self._db.execute("DELETE FROM entries WHERE created < ?", (now - self.max_age,))
+        self._db.execute(
+            "DELETE FROM entries WHERE key IN ("
+            "SELECT key FROM entries ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
+        for key in [k for k, (_, created) in self._memory.items() if now - created > self.max_age]:
+            del self._memory[key]
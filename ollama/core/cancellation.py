@@ -0,0 +1,54 @@
+import threading
+
+
+class CancellationToken:
+    """
+    Thread-safe flag that asks an in-flight generation to stop.
+    Code doing the work registers callbacks with on_cancel() (for example to
+    close the streaming connection); cancel() runs them once, from the
+    cancelling thread.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.reason = None
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self, reason="Cancelled by user."):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def on_cancel(self, callback):
+        """
+        Registers callback to run on cancel (immediately if already cancelled).
+        Returns a function that unregisters it; call that once the work is
+        done so a late cancel cannot touch resources that were reused.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        callback()
+        return lambda: None
+
+    def wait(self, timeout=None):
+        return self._event.wait(timeout)
+
+    def _remove(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
@@ -0,0 +1,133 @@
+import threading
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 300
+
+_watchers = threading.local()
+
+
+class _WatchedPool:
+    # Hands every connection the calling thread checks out to its watcher
+    # (see OllamaClient.watch_connections).
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)
+        watcher = getattr(_watchers, "callback", None)
+        if watcher is not None:
+            watcher(conn)
+        return conn
+
+
+class WatchedHTTPConnectionPool(_WatchedPool, HTTPConnectionPool):
+    pass
+
+
+class WatchedHTTPSConnectionPool(_WatchedPool, HTTPSConnectionPool):
+    pass
+
+
+class OllamaClient:
+    """
+    HTTP client for one Ollama base URL. Keeps a pooled keep-alive
+    requests.Session so repeated calls reuse their TCP connections.
+
+    Connection failures are retried for every method (nothing reached the
+    server yet); 502/503/504 answers are only retried for GET.
+    Timeouts given per call are read timeouts; the connect timeout always
+    comes from the client.
+    """
+
+    def __init__(
+        self,
+        base_url,
+        pool_size=DEFAULT_POOL_SIZE,
+        max_retries=DEFAULT_MAX_RETRIES,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+        read_timeout=DEFAULT_READ_TIMEOUT,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=0,
+            status=max_retries,
+            backoff_factor=0.2,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        adapter.poolmanager.pool_classes_by_scheme = {"http": WatchedHTTPConnectionPool,
+                                                      "https": WatchedHTTPSConnectionPool}
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def url(self, path):
+        return f"{self.base_url}{path}"
+
+    def timeout(self, read_timeout=None):
+        return (self.connect_timeout, read_timeout if read_timeout is not None else self.read_timeout)
+
+    def get(self, path, timeout=None, **kwargs):
+        return self.session.get(self.url(path), timeout=self.timeout(timeout), **kwargs)
+
+    def post(self, path, timeout=None, **kwargs):
+        return self.session.post(self.url(path), timeout=self.timeout(timeout), **kwargs)
+
+    @staticmethod
+    @contextmanager
+    def watch_connections(callback):
+        """
+        Calls callback(connection) with each urllib3 connection this thread
+        checks out inside the block, before the request is sent. Lets another
+        thread abort a call that has no response object yet, e.g. a generation
+        still waiting for its headers.
+        """
+        previous = getattr(_watchers, "callback", None)
+        _watchers.callback = callback
+        try:
+            yield
+        finally:
+            _watchers.callback = previous
+
+    def close(self):
+        self.session.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(base_url, **settings):
+    """
+    Returns the shared client for base_url, creating it on first use.
+    Settings only apply when the client is created; pass them from the
+    component that owns the URL (CoreManager) before anything else uses it.
+    """
+    key = base_url.rstrip("/")
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = OllamaClient(key, **settings)
+            _clients[key] = client
+        return client
+
+
+def close_all():
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
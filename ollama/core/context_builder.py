@@ -0,0 +1,135 @@
+from functools import lru_cache
+
+DEFAULT_NUM_CTX = 4096
+# Allowance for a section heading ("Conversation so far:") and its separators.
+SECTION_TOKENS = 10
+
+
+@lru_cache(maxsize=4096)
+def estimate_tokens(text):
+    """
+    Rough token count for English text with a BPE tokenizer (about four
+    characters or three quarters of a word per token, whichever is more).
+    Cached, so stored session messages are only measured once.
+    """
+    if not text:
+        return 0
+    return max((len(text) + 3) // 4, (len(text.split()) * 4 + 2) // 3)
+
+
+def truncate_to_tokens(text, budget):
+    if estimate_tokens(text) <= budget:
+        return text
+    if budget <= 0:
+        return ""
+    text = text[:budget * 4]
+    while text and estimate_tokens(text) > budget:
+        text = text[:int(len(text) * 0.9)]
+    return text.rstrip() + " …"
+
+
+def summarize_turn(message, words=20):
+    # One-line extractive summary of a dropped turn.
+    content = " ".join(message.get("content", "").split()[:words])
+    role = "User" if message.get("role") == "user" else "Assistant"
+    return f"- {role}: {content}"
+
+
+class ContextBuilder:
+    """
+    Assembles the prompt for one turn under a token budget: system text, the
+    question, local KB chunks, web results and as much of the conversation
+    as still fits, newest turns first. Turns that no longer fit are
+    summarized in one line each (while summary_share of the budget allows)
+    and otherwise dropped, oldest first.
+
+    retrieval_share caps the room KB chunks and web results may take so a
+    long search result cannot crowd out the conversation entirely.
+    """
+
+    def __init__(self, system_prompt="", retrieval_share=0.5, summary_share=0.1):
+        self.system_prompt = system_prompt
+        self.retrieval_share = retrieval_share
+        self.summary_share = summary_share
+
+    @staticmethod
+    def input_budget(num_ctx, num_predict):
+        # Whatever the answer may need is kept free, up to half the window.
+        return num_ctx - min(num_predict, num_ctx // 2)
+
+    def build(self, message, budget, history=None, kb_results=None, search_results=None, carried_tokens=0,
+              system_prompt=None):
+        """
+        Returns a dict with the prompt, its estimated tokens and whether the
+        caller may keep sending the previous turn's KV context
+        (carried_tokens long) with it. When that context plus the new prompt
+        would overflow the budget, the prompt carries a windowed transcript of
+        history instead and use_context is False. system_prompt overrides
+        self.system_prompt for this prompt only.
+        """
+        system = (self.system_prompt if system_prompt is None else system_prompt).strip()
+        retrieval_budget = max(int(budget * self.retrieval_share), 0)
+        kb_text = truncate_to_tokens(str(kb_results), retrieval_budget // 2 if search_results else retrieval_budget) \
+            if kb_results else ""
+        web_text = truncate_to_tokens(str(search_results), retrieval_budget - estimate_tokens(kb_text)) \
+            if search_results else ""
+        # The prompt without any conversation, instructions included.
+        fixed = estimate_tokens(self.render(message, system, [], [], kb_text, web_text)) + SECTION_TOKENS
+
+        use_context = bool(carried_tokens) and carried_tokens + fixed <= budget
+        included, summaries = [], []
+        if not use_context and history:
+            remaining = budget - fixed
+            costs = [estimate_tokens(m.get("content", "")) + 4 for m in history]
+            # If the whole transcript does not fit, keep room for summarizing what is cut.
+            summary_budget = 0 if sum(costs) <= remaining else min(int(budget * self.summary_share), remaining)
+            summary_budget = max(summary_budget - SECTION_TOKENS, 0)
+            remaining -= summary_budget
+            first = len(history)
+            while first > 0 and costs[first - 1] <= remaining:
+                first -= 1
+                remaining -= costs[first]
+            included = history[first:]
+            summary_budget += remaining
+            for dropped in reversed(history[:first]):
+                line = summarize_turn(dropped)
+                if estimate_tokens(line) > summary_budget:
+                    break
+                summaries.insert(0, line)
+                summary_budget -= estimate_tokens(line)
+
+        prompt = self.render(message, system, included, summaries, kb_text, web_text)
+        return {
+            "prompt": prompt,
+            "prompt_tokens": estimate_tokens(prompt),
+            "use_context": use_context,
+            "history_turns": len(included),
+            "summarized_turns": len(summaries),
+            "dropped_turns": len(history or []) - len(included) - len(summaries) if not use_context else 0,
+        }
+
+    @staticmethod
+    def render(message, system, included, summaries, kb_text, web_text):
+        if not (system or included or summaries or kb_text or web_text):
+            return message
+        sections = []
+        if system:
+            sections.append(system)
+        if summaries:
+            sections.append("Earlier in this conversation (summarized):\n" + "\n".join(summaries))
+        if included:
+            lines = [f"{'User' if m.get('role') == 'user' else 'Assistant'}: {m.get('content', '')}" for m in included]
+            sections.append("Conversation so far:\n" + "\n\n".join(lines))
+        if kb_text or web_text:
+            sections.append(f"""Question: {message}
+
+Local Knowledge Context:
+{kb_text or "No local KB results."}
+
+Web Search Results:
+{web_text or "No web search results."}
+
+Please answer the question based on the provided context. If the context isn’t relevant, use your general knowledge to provide the best answer possible.""")
+        else:
+            sections.append(f"User: {message}" if included or summaries else message)
+        return "\n\n".join(sections)
@@ -1,106 +1,574 @@
 # core_manager.py
 
+import asyncio
+import functools
+import threading
 import time
+from collections import OrderedDict
 from . import api
+from . import async_api
+from . import client as http_client
+from . import scheduler
+from . import retrieval
 from . import search
 from . import session as session_manager
+from .backend_pool import BackendPool
+from .cancellation import CancellationToken
+from .context_builder import DEFAULT_NUM_CTX, ContextBuilder
+from .knowledge_base import ResidentKB
+from .metrics import InferenceMetrics
+from .rerank import RERANK_AVAILABLE, Reranker, format_passages, passages_from_results
+from .response_cache import ResponseCache
+from .search_cache import SearchCache
+from .semantic_cache import SEMANTIC_CACHE_AVAILABLE, SemanticCache
 
 
-# Removed: from local_retriever import search_index
-# Removed: from kb.kb_manager import load_existing_index
-
 class CoreManager:
-    def __init__(self):
-        self.ollama_url = "http://localhost:11434"
+    def __init__(self, backends=None, load_kb=True):
+        # Ollama servers to spread requests over. The first is the primary one
+        # (the setup wizard's server); a single entry behaves like one host.
+        self.backend_urls = list(backends) if backends else ["http://localhost:11434"]
+        self.ollama_url = self.backend_urls[0]
+        # Pooled keep-alive HTTP client per backend, shared by every call to it.
+        self.http_pool_size = 10
+        self.http_max_retries = 2
+        self.http_connect_timeout = 3.05
+        self.http_read_timeout = 300
+        for url in self.backend_urls:
+            http_client.get_client(
+                url,
+                pool_size=self.http_pool_size,
+                max_retries=self.http_max_retries,
+                connect_timeout=self.http_connect_timeout,
+                read_timeout=self.http_read_timeout,
+            )
+        self.client = http_client.get_client(self.ollama_url)
+        # Admission control in front of each backend: at most max_concurrent_requests
+        # model calls at once, interactive chat first, then warm-up, then batch/pulls.
+        self.max_concurrent_requests = 2
+        self.scheduler = scheduler.get_scheduler(self.ollama_url, max_concurrent=self.max_concurrent_requests)
+        # Cached /api/tags per backend (the primary's is shared with the setup
+        # wizard), refreshed at most every model_list_ttl seconds. The pool routes
+        # each request to a healthy backend that has the model and stands in for
+        # a model registry over the union of their models.
+        self.model_list_ttl = 30
+        self.backend_pool = BackendPool(self.backend_urls, ttl=self.model_list_ttl,
+                                        max_concurrent=self.max_concurrent_requests)
+        self.model_registry = self.backend_pool
+        if len(self.backend_urls) > 1:
+            self.backend_pool.start_health_checks()
+        # Long-lived event loop thread shared by GUI work (generations, health checks, model refreshes).
+        self.loop = async_api.get_event_loop_thread()
         self.current_model = None
+        # Model residency: the selected model is preloaded in the background and
+        # kept loaded for keep_alive; the previously selected one is unloaded.
+        self.keep_alive = "30m"
+        self.warm_up_on_select = True
+        self.unload_previous_model = True
+        self.model_status = {}
+        # Called as on_model_status(model, status) from the event loop thread.
+        self.on_model_status = None
+        self.temperature = 0.7
+        self.num_predict = 2048
+        # Prompt assembly: system text, conversation window and retrieval are fit
+        # into num_ctx (capped at the model's trained length) minus room for the answer.
+        self.num_ctx = DEFAULT_NUM_CTX
+        self.system_prompt = ""
+        self.context_builder = ContextBuilder()
+        # {model: trained context length, or None if /api/show did not say}.
+        self.model_context_lengths = {}
+        # Generation deadlines in seconds (the connect deadline is http_connect_timeout).
+        # first_token_timeout also bounds each gap between streamed tokens.
+        self.first_token_timeout = 120
+        self.total_timeout = 600
+        # Cancellation token of the in-flight generation for each session id.
+        self.active_generations = {}
+        self._active_lock = threading.Lock()
+        # Opt-in exact-match answer cache; only used at temperature 0 unless forced.
+        self.response_cache_enabled = False
+        self.force_response_cache = False
+        self.response_cache = None
+        # Opt-in paraphrase cache: reuse the answer to a similar earlier question
+        # (cosine similarity >= semantic_cache_threshold) for the same model.
+        self.semantic_cache_enabled = False
+        self.semantic_cache_threshold = 0.92
+        self.semantic_cache = None
         self.web_search_enabled = True
         self.search_engine = "DuckDuckGo"
         self.max_search_results = 3
         self.search_timeout = 10
+        # Optional enrichment: read the top search_read_pages result pages in
+        # parallel (search_page_timeout seconds for all of them) and add up to
+        # search_page_chars of each page's text to its result.
+        self.search_read_pages = 0
+        self.search_page_timeout = 5
+        self.search_page_chars = 3000
+        # Web results are reused for search_cache_ttl seconds and, while a
+        # refresh runs in the background, for up to search_cache_stale_ttl.
+        self.search_cache_enabled = True
+        self.search_cache_ttl = 15 * 60
+        self.search_cache_stale_ttl = 24 * 3600
+        self.search_cache = None
+        # Web snippets and page passages are ordered by similarity to the
+        # question (same embedding model as the local KB); only the best ones
+        # within rerank_token_budget go into the prompt, near-duplicates dropped.
+        self.rerank_search_results = True
+        self.rerank_token_budget = 1000
+        self.reranker = None
+        # Shared deadline for all retrieval sources, which run in parallel; a
+        # source that misses it is skipped and reported in the debug info.
+        self.retrieval_deadline = 10
         self.search_debug_info = ""
         self.kb_debug_info = ""
         self.show_web_debug = False
         self.show_kb_debug = False
         self.current_session = None
-        self.sessions = session_manager.load_sessions()
+        # Headers only ({id: {"title", "model", timestamps, "message_count"}}),
+        # from the session catalog; message bodies are read on demand.
+        self.sessions = session_manager.load_catalog()
+        # Full sessions opened through get_session (API clients), kept with
+        # their KV context; the least recently used are closed past the limit.
+        self.max_open_sessions = 64
+        self.open_sessions = OrderedDict()
+        self._open_lock = threading.Lock()
+        # Per-model latency / tokens-per-second rollup, seeded in the background
+        # from the metrics stored with the answers of the most recent sessions.
+        self.inference_metrics = InferenceMetrics()
+        self.metrics_seed_sessions = 50
+        threading.Thread(target=self.seed_inference_metrics, name="metrics-seed", daemon=True).start()
 
-        # Local KB retrieval has been disabled.
-        # If you need local KB retrieval later, you could load your FAISS index, chunks, and metadata here.
-        self.kb_index = None
-        self.kb_chunks = []
-        self.kb_metadata = []
+        # Local KB: index, chunks and metadata are loaded once in the background
+        # and queried from memory; reload_kb() swaps in a rebuilt index.
+        self.kb_top_k = 3
+        self.kb = ResidentKB()
+        if load_kb:
+            self.kb.load_in_background()
 
     def get_models(self):
-        return api.get_models(self.ollama_url)
+        return self.model_registry.get_models()
 
     def check_server_connection(self):
-        return api.check_server_connection(self.ollama_url)
+        return self.model_registry.check_server_connection()
+
+    def refresh_models(self, force=True):
+        # Non-blocking; registry subscribers hear about the result.
+        self.model_registry.refresh_in_background(force=force)
+
+    def submit(self, coro):
+        """
+        Runs a coroutine on the shared event loop thread and returns a
+        concurrent.futures.Future for its result.
+        """
+        return self.loop.submit(coro)
+
+    async def aget_models(self):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.model_registry.get_models)
+
+    async def acheck_server_connection(self):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.model_registry.check_server_connection)
+
+    def context_window(self, model):
+        """
+        The num_ctx to run model with: self.num_ctx, capped at the model's
+        trained context length (asked once per model from /api/show; a
+        failed lookup is remembered too, so later turns do not wait on it).
+        """
+        if model and model not in self.model_context_lengths:
+            backend = self.backend_pool.pick(model)
+            length = api.get_context_length(backend.ollama_url, model) if backend else None
+            self.model_context_lengths[model] = length
+        return min(self.num_ctx, self.model_context_lengths.get(model) or self.num_ctx)
+
+    def session_history(self, session, message):
+        # Earlier turns of the session, without the message being answered
+        # if the caller already stored it.
+        messages = list(session.get("messages", [])) if session else []
+        if messages and messages[-1].get("role") == "user" and messages[-1].get("content") == message:
+            messages.pop()
+        return messages
+
+    def reload_kb(self):
+        # on_index_updated_callback for the KB manager: non-blocking; queries
+        # keep using the current index until the new one is loaded.
+        self.kb.reload()
 
-    def generate_response(self, message, with_search=False, with_local_kb=True):
+    def search_kb(self, message):
+        # Top local KB chunks for message, formatted for the prompt.
+        results = self.kb.search(message, self.kb_top_k)
+        return "\n\n".join(f"[{meta.get('filename')}] {chunk}" for chunk, _, meta in results)
+
+    def web_search(self, message):
+        # Blocking; goes through the search cache when it is enabled.
+        engine, max_results, timeout = self.search_engine, self.max_search_results, self.search_timeout
+        read_pages, page_timeout, page_chars = self.search_read_pages, self.search_page_timeout, self.search_page_chars
+
+        def fetch():
+            return search.perform_web_search(message, engine, max_results, timeout, read_pages=read_pages,
+                                             page_timeout=page_timeout, page_chars=page_chars)
+
+        if not self.search_cache_enabled:
+            return fetch()
+        if self.search_cache is None:
+            self.search_cache = SearchCache(ttl=self.search_cache_ttl, stale_ttl=self.search_cache_stale_ttl)
+        self.search_cache.ttl = self.search_cache_ttl
+        # Results with page text are cached apart from snippet-only ones.
+        cache_engine = f"{engine} +{read_pages} pages" if read_pages else engine
+        return self.search_cache.search(cache_engine, message, max_results, fetch)
+
+    def ranked_web_search(self, message):
+        # web_search, with the results reranked and trimmed when possible.
+        result = self.web_search(message)
+        if not (self.rerank_search_results and RERANK_AVAILABLE and result.get("items")):
+            return result
+        if self.reranker is None:
+            self.reranker = Reranker(self.kb.model_name)
+        ranked = self.reranker.rerank(message, passages_from_results(result["items"]), self.rerank_token_budget)
+        if not ranked["passages"]:
+            return result
+        return {**result, "results": format_passages(message, ranked["passages"]),
+                "debug": f"{result['debug']}\n{ranked['summary']}"}
+
+    def prepare_prompt(self, message, with_search=False, with_local_kb=True, history=None, carried_tokens=0,
+                       model=None, system_prompt=None, num_predict=None):
+        """
+        Runs retrieval for a user message and assembles the prompt sent to the model
+        under the model's token budget (see ContextBuilder.build). carried_tokens is
+        the length of the KV context that would be sent along. system_prompt and
+        num_predict default to the manager's settings.
+        Blocking; returns a dict with prompt, search_results, kb_debug_info, num_ctx
+        and the builder's accounting (use_context, history_turns, ...).
+        """
         search_results = None
         local_results = None
         kb_debug_info = ""
 
-        # 1. Web search retrieval.
+        # 1. Retrieval: every enabled source at once, under one deadline.
+        sources = {}
         if with_search and self.web_search_enabled:
-            search_result_data = search.perform_web_search(
-                message, self.search_engine, self.max_search_results, self.search_timeout
-            )
+            sources["web"] = lambda: self.ranked_web_search(message)
+        if with_local_kb and self.kb.ready:
+            sources["kb"] = lambda: self.search_kb(message)
+        outcome = retrieval.run_sources(sources, self.retrieval_deadline)
+        timing = retrieval.describe(outcome, self.retrieval_deadline) if sources else ""
+
+        # 2. Web search results.
+        if "web" in outcome["results"]:
+            search_result_data = outcome["results"]["web"]
             search_results = search_result_data.get("results")
-            self.search_debug_info = search_result_data.get("debug")
+            self.search_debug_info = f"{search_result_data.get('debug')}\n{timing}"
+        elif "web" in sources:
+            self.search_debug_info = timing
+
+        # 3. Local KB results (skipped until the index is in memory).
+        if "kb" in outcome["results"]:
+            local_results = outcome["results"]["kb"]
+            kb_debug_info = f"Local KB results:\n{local_results}\n{timing}"
+        elif "kb" in sources:
+            kb_debug_info = timing
+        else:
+            kb_debug_info = "Local KB retrieval skipped." if not with_local_kb else f"Local KB {self.kb.status}."
 
-        # 2. Local KB retrieval is disabled.
-        kb_debug_info = "Local KB retrieval disabled."
-        # (If enabled in the future, you would call search_index here.)
+        # 4. Build the prompt.
+        num_ctx = self.context_window(model or self.current_model)
+        num_predict = self.num_predict if num_predict is None else num_predict
+        built = self.context_builder.build(
+            message, ContextBuilder.input_budget(num_ctx, num_predict), history=history,
+            kb_results=local_results, search_results=search_results, carried_tokens=carried_tokens,
+            system_prompt=self.system_prompt if system_prompt is None else system_prompt
+        )
+        return {**built, "search_results": search_results, "kb_debug_info": kb_debug_info, "num_ctx": num_ctx}
 
-        # 3. Build the prompt.
-        prompt = message
-        if search_results or local_results:
-            prompt = f"""Question: {message}
+    def set_model(self, model):
+        # The session's KV context was produced by the old model and is useless to a new one.
+        if model != self.current_model:
+            previous = self.current_model
+            self.current_model = model
+            self.reset_context()
+            if self.warm_up_on_select and model:
+                self.submit(self.switch_model(previous, model))
 
-Local Knowledge Context:
-{local_results or "No local KB results."}
+    def set_model_status(self, model, status):
+        self.model_status[model] = status
+        if self.on_model_status:
+            self.on_model_status(model, status)
 
-Web Search Results:
-{search_results or "No web search results."}
+    async def switch_model(self, previous, model):
+        """
+        Unloads the previous model (if configured, on every backend that has
+        it) and preloads model with an empty prompt, so the first question
+        does not pay the load time.
+        Status goes cold -> loading -> warm (or error).
+        """
+        if previous and previous != model and self.unload_previous_model:
+            for backend in self.backend_pool.backends_for(previous):
+                await async_api.unload_model(backend.ollama_url, previous)
+            self.set_model_status(previous, "cold")
+        self.set_model_status(model, "loading")
+        # Same num_ctx as the generations will use, or the first one reloads the model.
+        num_ctx = await asyncio.get_running_loop().run_in_executor(None, self.context_window, model)
+        # Warms the backend the next request for model would be routed to.
+        result = await self.backend_pool.acall(
+            model, lambda url: async_api.load_model(url, model, self.keep_alive, num_ctx=num_ctx)
+        )
+        if result.get("success"):
+            self.set_model_status(model, "warm")
+        else:
+            self.set_model_status(model, "error")
+        return result
 
-Please answer the question based on the provided context. If the context isn’t relevant, use your general knowledge to provide the best answer possible."""
+    def reset_context(self, session=None):
+        session = session if session is not None else self.current_session
+        if session:
+            session.pop("context", None)
+            session.pop("context_model", None)
 
-        response = api.generate_response(self.ollama_url, self.current_model, prompt)
+    def session_context(self, session, model):
+        """
+        Returns the Ollama token context of the session's previous turn if it
+        was produced by model, so the next turn continues the conversation
+        without re-evaluating it.
+        """
+        if session and session.get("context_model") == model:
+            return session.get("context")
+        return None
+
+    def update_session_context(self, session, model, response):
+        if session is not None and response.get("success") and response.get("context"):
+            session["context"] = response["context"]
+            session["context_model"] = model
+
+    def track_generation(self, session, cancel_token):
+        # A session has at most one generation in flight; a new message supersedes the old one.
+        # Unsaved sessions (API requests that carry their own history) have no id and are not tracked.
+        if not session or not session.get("id"):
+            return
+        with self._active_lock:
+            previous = self.active_generations.get(session.get("id"))
+            self.active_generations[session.get("id")] = cancel_token
+        if previous is not None and previous is not cancel_token:
+            previous.cancel("Superseded by a newer message.")
+
+    def untrack_generation(self, session, cancel_token):
+        if not session or not session.get("id"):
+            return
+        with self._active_lock:
+            if self.active_generations.get(session.get("id")) is cancel_token:
+                del self.active_generations[session.get("id")]
+
+    def cancel_generation(self, session_id=None, reason="Cancelled by user."):
+        """
+        Stops the in-flight generation of session_id (default: the current
+        session). Its streaming connection is closed so Ollama stops computing.
+        """
+        if session_id is None:
+            if not self.current_session:
+                return False
+            session_id = self.current_session.get("id")
+        with self._active_lock:
+            cancel_token = self.active_generations.pop(session_id, None)
+        if cancel_token is None:
+            return False
+        cancel_token.cancel(reason)
+        return True
+
+    def start_turn(self, message, with_search=False, with_local_kb=True, cancel_token=None, session=None, model=None,
+                   system_prompt=None, temperature=None, num_predict=None):
+        """
+        Everything that happens before the model is called: retrieval, prompt
+        assembly, the session's KV context and the response cache lookup.
+        The KV context is only kept while it and the new prompt fit the model's
+        budget; otherwise the prompt carries a window of the transcript instead.
+        Blocking. The returned turn pins the session, model and sampling settings
+        so a session switch mid-generation cannot attach this turn to the wrong
+        conversation. Callers serving several conversations at once (the API
+        server) pass session, model and the settings explicitly; None means the
+        current session / model and the manager's settings.
+        """
+        session = session if session is not None else self.current_session
+        model = model or self.current_model
+        temperature = self.temperature if temperature is None else temperature
+        num_predict = self.num_predict if num_predict is None else num_predict
+        context = self.session_context(session, model)
+        history = self.session_history(session, message)
+        cancel_token = cancel_token or CancellationToken()
+        self.track_generation(session, cancel_token)
+        turn = {
+            "message": message,
+            "started": time.perf_counter(),
+            "session": session,
+            "model": model,
+            "temperature": temperature,
+            "num_predict": num_predict,
+            "context": context,
+            "cache_key": None,
+            "cached_response": None,
+            "semantic_lookup": False,
+            "cancel_token": cancel_token,
+        }
+        # The paraphrase cache is keyed on the bare question, so it is only
+        # consulted for standalone questions (no conversation to continue),
+        # and before retrieval so a hit skips web search as well.
+        if self.semantic_cache_enabled and SEMANTIC_CACHE_AVAILABLE and not context and not history:
+            if self.semantic_cache is None:
+                self.semantic_cache = SemanticCache()
+            self.semantic_cache.threshold = self.semantic_cache_threshold
+            answer, score = self.semantic_cache.lookup(model, message)
+            turn["semantic_lookup"] = True
+            if answer is not None:
+                turn.update(prompt=message, search_results=None,
+                            kb_debug_info=f"Semantic cache hit (similarity {score:.3f}).")
+                turn["cached_response"] = {"success": True, "ai_response": answer, "semantic_score": score}
+                return turn
+        prepared = self.prepare_prompt(message, with_search, with_local_kb, history=history,
+                                       carried_tokens=len(context) if context else 0, model=model,
+                                       system_prompt=system_prompt, num_predict=num_predict)
+        turn.update(prepared)
+        if not prepared["use_context"]:
+            context = turn["context"] = None
+        if self.response_cache_enabled and ResponseCache.is_cacheable(temperature, self.force_response_cache):
+            if self.response_cache is None:
+                self.response_cache = ResponseCache()
+            turn["cache_key"] = ResponseCache.make_key(
+                model, prepared["prompt"], temperature, num_predict, context
+            )
+            cached = self.response_cache.get(turn["cache_key"])
+            if cached:
+                turn["cached_response"] = {"success": True, **cached}
+        return turn
+
+    def finish_turn(self, turn, response, cached=False):
+        self.untrack_generation(turn["session"], turn["cancel_token"])
+        self.update_session_context(turn["session"], turn["model"], response)
+        if not cached:
+            self.inference_metrics.record(response.get("metrics"))
+        if turn["cache_key"] and not cached and response.get("success"):
+            self.response_cache.put(turn["cache_key"], response)
+        if turn["semantic_lookup"] and not cached and response.get("success"):
+            self.semantic_cache.put(
+                turn["model"], turn["message"], response.get("ai_response", ""),
+                cost=time.perf_counter() - turn["started"]
+            )
         return {
             **response,
-            "search_results": search_results,
-            "kb_debug_info": kb_debug_info
+            "cached": cached,
+            "search_results": turn["search_results"],
+            "kb_debug_info": turn["kb_debug_info"]
         }
 
+    def scheduler_metrics(self):
+        return self.scheduler.metrics()
+
+    def backend_status(self):
+        return self.backend_pool.status()
+
+    def model_metrics(self):
+        return self.inference_metrics.summary()
+
+    def generate_response(self, message, with_search=False, with_local_kb=True, on_token=None, cancel_token=None,
+                          priority=scheduler.INTERACTIVE, **turn_settings):
+        """
+        Answers a user message. If on_token is given, the answer is streamed and
+        on_token(text) is called from this thread for every fragment.
+        The result carries the call's timing and token counts in "metrics".
+        A response cache hit returns the whole answer at once with "cached": True
+        and does not call on_token.
+        Cancelling cancel_token (or cancel_generation(), or a newer message in
+        the same session) stops the request; the result then has "cancelled": True.
+        priority is the scheduler class; bulk callers pass scheduler.BATCH.
+        turn_settings (session, model, system_prompt, temperature, num_predict)
+        override the current session and the manager's settings for this call
+        only; see start_turn.
+        """
+        turn = self.start_turn(message, with_search, with_local_kb, cancel_token, **turn_settings)
+        if turn["cached_response"]:
+            return self.finish_turn(turn, turn["cached_response"], cached=True)
+        if turn["cancel_token"].cancelled:
+            return self.finish_turn(turn, api.cancelled_result(turn["cancel_token"].reason, []))
+        response = self.backend_pool.call(turn["model"], lambda url: api.generate_response(
+            url, turn["model"], turn["prompt"], turn["temperature"], turn["num_predict"],
+            on_token=on_token, context=turn["context"], keep_alive=self.keep_alive,
+            cancel_token=turn["cancel_token"], first_token_timeout=self.first_token_timeout,
+            total_timeout=self.total_timeout, priority=priority, num_ctx=turn["num_ctx"]
+        ))
+        return self.finish_turn(turn, response)
+
+    async def agenerate_response(self, message, with_search=False, with_local_kb=True, on_token=None,
+                                 cancel_token=None, priority=scheduler.INTERACTIVE, **turn_settings):
+        """
+        Coroutine version of generate_response for the shared event loop.
+        Retrieval is blocking, so it runs in the loop's default executor;
+        on_token is called on the event loop thread.
+        """
+        loop = asyncio.get_running_loop()
+        turn = await loop.run_in_executor(None, functools.partial(
+            self.start_turn, message, with_search, with_local_kb, cancel_token, **turn_settings
+        ))
+        if turn["cached_response"]:
+            return self.finish_turn(turn, turn["cached_response"], cached=True)
+        if turn["cancel_token"].cancelled:
+            return self.finish_turn(turn, api.cancelled_result(turn["cancel_token"].reason, []))
+        response = await self.backend_pool.acall(turn["model"], lambda url: async_api.generate_response(
+            url, turn["model"], turn["prompt"], turn["temperature"], turn["num_predict"],
+            on_token=on_token, context=turn["context"], keep_alive=self.keep_alive,
+            cancel_token=turn["cancel_token"], first_token_timeout=self.first_token_timeout,
+            total_timeout=self.total_timeout, priority=priority, num_ctx=turn["num_ctx"]
+        ))
+        return self.finish_turn(turn, response)
+
     def new_session(self):
+        self.cancel_generation(reason="Session closed.")
         session_id, session_data = session_manager.new_session(self.current_model)
         self.current_session = session_data
-        self.sessions[session_id] = session_data
         return session_id
 
     def load_session(self, session_id):
         session_data = session_manager.load_session(session_id)
         if session_data:
+            self.cancel_generation(reason="Session closed.")
+            # Never continue from a context we did not produce in this process.
+            self.reset_context(session_data)
             self.current_session = session_data
             return True
         return False
 
+    def get_session(self, session_id):
+        # Full session (messages included), read from disk the first time it is asked for.
+        if self.current_session and self.current_session.get("id") == session_id:
+            return self.current_session
+        with self._open_lock:
+            session = self.open_sessions.get(session_id)
+            if session is None and session_id in self.sessions:
+                session = session_manager.load_session(session_id)
+                if session:
+                    self.open_sessions[session_id] = session
+                    while len(self.open_sessions) > self.max_open_sessions:
+                        self.open_sessions.popitem(last=False)
+            elif session is not None:
+                self.open_sessions.move_to_end(session_id)
+            return session
+
+    def seed_inference_metrics(self):
+        recent = sorted(list(self.sessions.values()), key=lambda s: s.get("updated_at") or "", reverse=True)
+        bodies = (session_manager.load_session(header["id"]) for header in recent[:self.metrics_seed_sessions])
+        self.inference_metrics.load_sessions(session for session in bodies if session)
+
     def delete_session(self, session_id):
         if session_manager.delete_session(session_id):
-            if session_id in self.sessions:
-                del self.sessions[session_id]
+            with self._open_lock:
+                self.open_sessions.pop(session_id, None)
             if self.current_session and self.current_session.get("id") == session_id:
                 self.new_session()
             return True
         return False
 
     def export_session(self, session_id, file_path):
-        session_data = self.sessions.get(session_id)
+        session_data = self.get_session(session_id)
         if session_data:
             return session_manager.export_session(session_data, file_path)
         return False
 
-    def store_message_in_session(self, role, message):
+    def store_message_in_session(self, role, message, metrics=None):
         if self.current_session:
-            session_manager.store_message_in_session(self.current_session, role, message)
+            session_manager.store_message_in_session(self.current_session, role, message, metrics)
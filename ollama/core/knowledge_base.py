@@ -0,0 +1,93 @@
+import threading
+import time
+
+
+def load_kb_from_disk():
+    # The saved FAISS index with its chunks and metadata (no embedding work).
+    from kb.kb_manager import load_existing_index
+    return load_existing_index()
+
+
+class ResidentKB:
+    """
+    The local knowledge base held in memory: FAISS index, chunk texts,
+    chunk metadata and the embedding model, loaded once in a background
+    thread so queries only cost a query embedding and an index search.
+
+    The three are swapped in together as one snapshot, so reload() can
+    install a rebuilt index while queries are running against the old one.
+    status is "not loaded", "loading", "ready", "empty" or "error: ...".
+    """
+
+    def __init__(self, loader=load_kb_from_disk, model_name="all-MiniLM-L6-v2"):
+        self.loader = loader
+        self.model_name = model_name
+        self.status = "not loaded"
+        self.loaded_at = None
+        self.load_seconds = None
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._loading = False
+        self._reload_pending = False
+
+    @property
+    def ready(self):
+        return self._snapshot is not None
+
+    def load_in_background(self):
+        """
+        Starts loading without blocking. A request that arrives while a load
+        is running is remembered and runs right after it, so the last signal
+        always wins.
+        """
+        with self._lock:
+            if self._loading:
+                self._reload_pending = True
+                return
+            self._loading = True
+            if self._snapshot is None:
+                self.status = "loading"
+        threading.Thread(target=self._load_loop, name="kb-loader", daemon=True).start()
+
+    reload = load_in_background
+
+    def _load_loop(self):
+        while True:
+            self._load_once()
+            with self._lock:
+                if not self._reload_pending:
+                    self._loading = False
+                    return
+                self._reload_pending = False
+
+    def _load_once(self):
+        started = time.perf_counter()
+        try:
+            index, chunks, metadata = self.loader()
+            if index is None or not chunks:
+                self._snapshot = None
+                self.status = "empty"
+                return
+            # Loading the embedding model takes seconds; do it here, not on the first query.
+            from local_retriever import get_embedding_model
+            get_embedding_model(self.model_name)
+            self._snapshot = (index, list(chunks), list(metadata))
+            self.status = "ready"
+            self.loaded_at = time.time()
+            self.load_seconds = time.perf_counter() - started
+        except Exception as e:
+            # Keep serving the previous snapshot, if any.
+            self.status = f"error: {e}"
+
+    def search(self, query, top_k=3):
+        """
+        Returns [(chunk, distance, metadata)] for the top_k closest chunks,
+        or [] while nothing is loaded.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return []
+        from local_retriever import search_index
+        index, chunks, metadata = snapshot
+        return search_index(query, index, chunks, metadata, top_k=min(top_k, len(chunks)),
+                            model_name=self.model_name)
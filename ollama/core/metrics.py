@@ -0,0 +1,60 @@
+import threading
+from collections import deque
+
+# Fields of an api.parse_metrics() record that are rolled up per model.
+ROLLUP_FIELDS = ("latency", "time_to_first_token", "tokens_per_second", "prompt_tokens_per_second",
+                 "load_duration")
+
+
+def percentile(values, fraction):
+    # Nearest-rank percentile of an already sorted list, as in the scheduler metrics.
+    return values[int(fraction * (len(values) - 1))] if values else 0.0
+
+
+class InferenceMetrics:
+    """
+    Per-model rollup of the metrics records returned with every generation
+    (see api.parse_metrics): p50/p95 latency, time to first token and
+    tokens/s over the last max_samples calls of each model.
+    """
+
+    def __init__(self, max_samples=500):
+        self.max_samples = max_samples
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, metrics):
+        if not metrics or not metrics.get("model"):
+            return
+        with self._lock:
+            samples = self._samples.get(metrics["model"])
+            if samples is None:
+                samples = self._samples[metrics["model"]] = deque(maxlen=self.max_samples)
+            samples.append(metrics)
+
+    def load_sessions(self, sessions):
+        # Seeds the rollup from the metrics stored with assistant messages.
+        for session in sessions:
+            for message in session.get("messages", []):
+                self.record(message.get("metrics"))
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self):
+        """
+        Returns {model: {"requests": n, "<field>_p50": ..., "<field>_p95": ...}}
+        for every field in ROLLUP_FIELDS, in seconds or tokens per second.
+        """
+        with self._lock:
+            snapshot = {model: list(samples) for model, samples in self._samples.items()}
+        summary = {}
+        for model, samples in snapshot.items():
+            row = {"requests": len(samples)}
+            for field in ROLLUP_FIELDS:
+                values = sorted(s[field] for s in samples if s.get(field) is not None)
+                row[f"{field}_p50"] = percentile(values, 0.5)
+                row[f"{field}_p95"] = percentile(values, 0.95)
+            summary[model] = row
+        return summary
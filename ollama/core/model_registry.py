@@ -0,0 +1,110 @@
+import threading
+import time
+
+from . import api
+
+DEFAULT_TTL = 30
+
+
+class ModelRegistry:
+    """
+    Cached view of one Ollama server's /api/tags: the installed models and
+    whether the server answered. Entries younger than ttl seconds are served
+    from memory; concurrent refreshes share a single in-flight request.
+
+    Subscribers are called as callback(models, online) from the refreshing
+    thread whenever the model list or the online state changes.
+    """
+
+    def __init__(self, ollama_url, ttl=DEFAULT_TTL, timeout=3):
+        self.ollama_url = ollama_url
+        self.ttl = ttl
+        self.timeout = timeout
+        self.models = []
+        self.online = None
+        self.fetched_at = None
+        self._lock = threading.Lock()
+        self._in_flight = None
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def is_fresh(self, max_age=None):
+        max_age = self.ttl if max_age is None else max_age
+        return self.fetched_at is not None and time.monotonic() - self.fetched_at < max_age
+
+    def cached_models(self):
+        # Never blocks; empty until the first refresh completes.
+        return list(self.models)
+
+    def get_models(self, max_age=None):
+        if not self.is_fresh(max_age):
+            self.refresh()
+        return list(self.models)
+
+    def check_server_connection(self, max_age=None):
+        if not self.is_fresh(max_age):
+            self.refresh()
+        return bool(self.online)
+
+    def refresh(self):
+        """
+        Fetches /api/tags now, or waits for the fetch another thread already
+        started. Returns (online, models).
+        """
+        with self._lock:
+            in_flight = self._in_flight
+            leader = in_flight is None
+            if leader:
+                in_flight = self._in_flight = threading.Event()
+        if not leader:
+            in_flight.wait()
+            return bool(self.online), list(self.models)
+
+        try:
+            online, models = api.fetch_tags(self.ollama_url, timeout=self.timeout)
+            with self._lock:
+                changed = models != self.models or online != self.online
+                self.models = models
+                self.online = online
+                self.fetched_at = time.monotonic()
+                subscribers = list(self._subscribers) if changed else []
+        finally:
+            with self._lock:
+                self._in_flight = None
+            in_flight.set()
+        for callback in subscribers:
+            callback(list(models), online)
+        return online, list(models)
+
+    def refresh_in_background(self, force=False):
+        # Starts a refresh without blocking the caller; a no-op while the
+        # cache is fresh (unless forced) or a refresh is already running.
+        if (not force and self.is_fresh()) or self._in_flight is not None:
+            return
+        threading.Thread(target=self.refresh, daemon=True).start()
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(ollama_url, **settings):
+    """
+    Returns the shared registry for ollama_url so the chat GUI and the setup
+    wizard read the same cache. Settings only apply on first creation.
+    """
+    key = ollama_url.rstrip("/")
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = ModelRegistry(key, **settings)
+            _registries[key] = registry
+        return registry
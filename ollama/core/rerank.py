@@ -0,0 +1,113 @@
+import importlib.util
+
+from .context_builder import estimate_tokens, truncate_to_tokens
+
+try:
+    import numpy as np
+
+    # Same embedding model as the local KB; only check it is installed here.
+    RERANK_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+except ImportError:
+    RERANK_AVAILABLE = False
+
+# Page text is cut into passages of about this many words.
+PASSAGE_WORDS = 80
+
+
+def split_passages(text, words=PASSAGE_WORDS):
+    # Consecutive lines grouped into passages of at most about `words` words.
+    passages, current = [], []
+    for line in text.splitlines():
+        line_words = line.split()
+        if current and len(current) + len(line_words) > words:
+            passages.append(" ".join(current))
+            current = []
+        current.extend(line_words)
+        while len(current) > words:
+            passages.append(" ".join(current[:words]))
+            current = current[words:]
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+def passages_from_results(items):
+    """
+    Turns search results ({"title", "snippet", "url"} and optionally the
+    page "content") into passages [{"text", "title", "url"}]: the snippet,
+    then the page text in PASSAGE_WORDS pieces.
+    """
+    passages = []
+    for item in items:
+        title, url = item.get("title") or "No title", item.get("url") or "No URL"
+        if item.get("snippet"):
+            passages.append({"text": item["snippet"], "title": title, "url": url})
+        for text in split_passages(item.get("content") or ""):
+            passages.append({"text": text, "title": title, "url": url})
+    return passages
+
+
+def format_passages(query, passages):
+    lines = [f"Web search results for: {query} (most relevant first)\n"]
+    for i, passage in enumerate(passages, 1):
+        lines.append(f"[{i}] {passage['title']} ({passage['url']})\n{passage['text']}\n")
+    return "\n".join(lines)
+
+
+class Reranker:
+    """
+    Orders web passages by cosine similarity to the question, using the same
+    SentenceTransformer as the local KB (loaded once per process). Keeps
+    the best ones that fit a token budget, skipping passages too similar to
+    one already kept (similarity >= duplicate_threshold) and, if min_score is
+    set, passages scoring below it.
+    """
+
+    def __init__(self, embedding_model_name="all-MiniLM-L6-v2", duplicate_threshold=0.92, min_score=0.0):
+        if not RERANK_AVAILABLE:
+            raise RuntimeError("Reranking needs numpy and sentence-transformers.")
+        self.embedding_model_name = embedding_model_name
+        self.duplicate_threshold = duplicate_threshold
+        self.min_score = min_score
+
+    def embed(self, texts):
+        from local_retriever import get_embedding_model
+        model = get_embedding_model(self.embedding_model_name)
+        return np.asarray(model.encode(texts, convert_to_numpy=True, normalize_embeddings=True), dtype="float32")
+
+    def rerank(self, question, passages, budget_tokens):
+        """
+        Returns {"passages": kept passages best first (each with its "score"),
+        "summary": one line for the debug pane}.
+        """
+        if not passages:
+            return {"passages": [], "summary": "Rerank: no passages."}
+        vectors = self.embed([question] + [p["text"] for p in passages])
+        scores = vectors[1:] @ vectors[0]
+        kept, kept_vectors = [], []
+        used = duplicates = low = over_budget = 0
+        for i in np.argsort(-scores):
+            score = float(scores[i])
+            if score < self.min_score:
+                low += 1
+                continue
+            if kept_vectors and float(np.max(np.stack(kept_vectors) @ vectors[i + 1])) >= self.duplicate_threshold:
+                duplicates += 1
+                continue
+            passage = passages[i]
+            # Title and URL line included.
+            cost = estimate_tokens(passage["text"]) + estimate_tokens(passage["title"] + passage["url"]) + 4
+            if used + cost > budget_tokens:
+                if kept:
+                    over_budget += 1
+                    continue
+                # The best passage is kept even if it has to be shortened.
+                room = budget_tokens - (cost - estimate_tokens(passage["text"]))
+                passage = {**passage, "text": truncate_to_tokens(passage["text"], room)}
+                cost = budget_tokens
+            kept.append({**passage, "score": score})
+            kept_vectors.append(vectors[i + 1])
+            used += cost
+        summary = (f"Rerank: kept {len(kept)} of {len(passages)} passages (~{used} tokens of {budget_tokens}); "
+                   f"dropped {duplicates} near-duplicates, {over_budget} over budget, {low} below min score")
+        return {"passages": kept, "summary": summary}
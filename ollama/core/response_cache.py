@@ -0,0 +1,47 @@
+import hashlib
+import json
+import os
+
+from .cache_store import LRUDiskCache, get_cache_dir
+
+
+class ResponseCache:
+    """
+    Opt-in cache of completed answers keyed by everything that determines
+    them: model, final prompt, conversation context, temperature and
+    num_predict. Sampling at temperature > 0 is not deterministic, so such
+    requests bypass the cache unless forced.
+    """
+
+    def __init__(self, path=None, max_memory_entries=256, max_disk_entries=5000, max_age=7 * 24 * 3600):
+        path = path or os.path.join(get_cache_dir(), "responses.sqlite3")
+        self.store = LRUDiskCache(path, max_memory_entries, max_disk_entries, max_age)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model, prompt, temperature, num_predict, context=None):
+        material = json.dumps(
+            [model, prompt, float(temperature), int(num_predict), context or []],
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def is_cacheable(temperature, force=False):
+        return force or temperature <= 0
+
+    def get(self, key):
+        value, _ = self.store.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, key, response):
+        # Only what is needed to replay the answer and continue the conversation.
+        self.store.put(key, {"ai_response": response.get("ai_response", ""), "context": response.get("context")})
+
+    def clear(self):
+        self.store.clear()
@@ -0,0 +1,69 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Sources of all messages share this many threads. A source that misses its
+# deadline keeps its thread until it returns, so a stuck backend can delay
+# later sources but never grows the thread count.
+SOURCE_WORKERS = 8
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def source_pool():
+    # Shared thread pool for retrieval sources, created on first use.
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=SOURCE_WORKERS, thread_name_prefix="retrieval")
+        return _pool
+
+
+def _run(source, started, timings, name):
+    try:
+        return source()
+    finally:
+        timings[name] = time.perf_counter() - started
+
+
+def run_sources(sources, deadline):
+    """
+    Runs every callable in sources ({name: source}) at once and waits at most
+    deadline seconds for all of them, so the stage takes as long as the
+    slowest source that makes it, not the sum.
+
+    Returns {"results": {name: value}, "errors": {name: message},
+    "late": [names], "timings": {name: seconds}, "elapsed": seconds}.
+    Sources run on the shared source_pool(); late ones finish there and
+    their results are dropped.
+    """
+    started = time.perf_counter()
+    timings = {}
+    pool = source_pool() if sources else None
+    futures = {name: pool.submit(_run, source, started, timings, name) for name, source in sources.items()}
+    wait(list(futures.values()), timeout=deadline)
+
+    outcome = {"results": {}, "errors": {}, "late": [], "timings": {}, "elapsed": time.perf_counter() - started}
+    for name, future in futures.items():
+        if not future.done():
+            outcome["late"].append(name)
+        elif future.exception() is not None:
+            outcome["errors"][name] = str(future.exception())
+        else:
+            outcome["results"][name] = future.result()
+        if name in timings:
+            outcome["timings"][name] = timings[name]
+    return outcome
+
+
+def describe(outcome, deadline):
+    # One line per source for the debug panes.
+    lines = []
+    for name, seconds in sorted(outcome["timings"].items()):
+        state = f"failed ({outcome['errors'][name]})" if name in outcome["errors"] else "ok"
+        lines.append(f"{name}: {state} in {seconds:.2f}s")
+    for name in outcome["late"]:
+        lines.append(f"{name}: no answer within {deadline}s, answered without it")
+    lines.append(f"Retrieval took {outcome['elapsed']:.2f}s")
+    return "\n".join(lines)
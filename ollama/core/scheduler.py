@@ -0,0 +1,176 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+# Priority classes, most urgent first.
+INTERACTIVE = 0
+WARMUP = 1
+BATCH = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", WARMUP: "warmup", BATCH: "batch"}
+
+DEFAULT_MAX_CONCURRENT = 2
+
+
+class _Waiter:
+    __slots__ = ("priority", "enqueued", "grant", "granted", "abandoned")
+
+    def __init__(self, priority, grant):
+        self.priority = priority
+        self.enqueued = time.monotonic()
+        self.grant = grant
+        self.granted = False
+        self.abandoned = False
+
+
+class RequestScheduler:
+    """
+    Admission control in front of one Ollama backend: at most max_concurrent
+    requests run at once, and queued requests are admitted by priority class
+    (INTERACTIVE, then WARMUP, then BATCH), first-in first-out within a class.
+
+    Blocking callers use slot(); coroutines use async_slot(). Both record
+    per-class queue wait times, exposed through metrics().
+    """
+
+    def __init__(self, max_concurrent=DEFAULT_MAX_CONCURRENT, wait_samples=500):
+        self.max_concurrent = max_concurrent
+        self._lock = threading.Lock()
+        self._queue = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._admitted = {p: 0 for p in PRIORITY_NAMES}
+        self._waits = {p: deque(maxlen=wait_samples) for p in PRIORITY_NAMES}
+
+    def _enqueue(self, waiter):
+        with self._lock:
+            heapq.heappush(self._queue, (waiter.priority, next(self._sequence), waiter))
+            self._dispatch()
+
+    def _dispatch(self):
+        # Caller holds the lock.
+        while self._in_flight < self.max_concurrent and self._queue:
+            _, _, waiter = heapq.heappop(self._queue)
+            if waiter.abandoned:
+                continue
+            waiter.granted = True
+            self._in_flight += 1
+            self._admitted[waiter.priority] += 1
+            self._waits[waiter.priority].append(time.monotonic() - waiter.enqueued)
+            waiter.grant()
+
+    def _abandon(self, waiter):
+        # The waiter gave up (cancelled); free its slot if it got one meanwhile.
+        with self._lock:
+            waiter.abandoned = True
+            granted = waiter.granted
+        if granted:
+            self.release()
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+            self._dispatch()
+
+    def acquire(self, priority=INTERACTIVE, cancel_token=None):
+        """
+        Blocks until a slot is free. Returns False (holding nothing) if
+        cancel_token is cancelled while waiting.
+        """
+        ready = threading.Event()
+        waiter = _Waiter(priority, ready.set)
+        unregister = cancel_token.on_cancel(ready.set) if cancel_token else None
+        self._enqueue(waiter)
+        ready.wait()
+        if unregister:
+            unregister()
+        if waiter.granted and not (cancel_token and cancel_token.cancelled):
+            return True
+        self._abandon(waiter)
+        return False
+
+    async def acquire_async(self, priority=INTERACTIVE):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def grant():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(True))
+
+        waiter = _Waiter(priority, grant)
+        self._enqueue(waiter)
+        try:
+            await future
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        return True
+
+    @contextmanager
+    def slot(self, priority=INTERACTIVE, cancel_token=None):
+        """
+        with scheduler.slot(priority) as admitted: ... -- admitted is False
+        only when cancel_token was cancelled before a slot was granted.
+        """
+        admitted = self.acquire(priority, cancel_token)
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                self.release()
+
+    @asynccontextmanager
+    async def async_slot(self, priority=INTERACTIVE):
+        await self.acquire_async(priority)
+        try:
+            yield True
+        finally:
+            self.release()
+
+    def outstanding(self):
+        # Requests running or waiting here; the backend pool routes on this.
+        with self._lock:
+            return self._in_flight + sum(1 for _, _, waiter in self._queue if not waiter.abandoned)
+
+    def metrics(self):
+        with self._lock:
+            depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for _, _, waiter in self._queue:
+                if not waiter.abandoned:
+                    depth[PRIORITY_NAMES[waiter.priority]] += 1
+            classes = {}
+            for priority, name in PRIORITY_NAMES.items():
+                waits = sorted(self._waits[priority])
+                classes[name] = {
+                    "admitted": self._admitted[priority],
+                    "queued": depth[name],
+                    "wait_avg": sum(waits) / len(waits) if waits else 0.0,
+                    "wait_p95": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+                    "wait_max": waits[-1] if waits else 0.0,
+                }
+            return {
+                "max_concurrent": self.max_concurrent,
+                "in_flight": self._in_flight,
+                "queue_depth": sum(depth.values()),
+                "classes": classes,
+            }
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(ollama_url, **settings):
+    """
+    Returns the shared scheduler for ollama_url. Settings only apply on first
+    creation, like client.get_client.
+    """
+    key = ollama_url.rstrip("/")
+    with _schedulers_lock:
+        scheduler = _schedulers.get(key)
+        if scheduler is None:
+            scheduler = RequestScheduler(**settings)
+            _schedulers[key] = scheduler
+        return scheduler
@@ -1,7 +1,12 @@
-import re
-import html
+import codecs
 import datetime
-from urllib.parse import quote_plus
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
+from urllib.parse import parse_qsl, quote_plus, urlencode, urlsplit
+
+from .search_parser import CHUNK_CHARS, extract_main_text, parse_results
 
 try:
     from duckduckgo_search import DDGS
@@ -10,8 +15,227 @@ try:
 except ImportError:
     DDGS_AVAILABLE = False
 
+# Engines a single search can use, and the setting that queries all of them at once.
+ENGINES = ["DuckDuckGo", "DuckDuckGo API", "Google"]
+ALL_ENGINES = "All engines"
+
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
+        " AppleWebKit/537.36 (KHTML, like Gecko)"
+        " Chrome/91.0.4472.124 Safari/537.36"
+    )
+}
+
+# Result page reading: at most PAGE_WORKERS downloads at once, each cut off
+# after page_max_bytes or its deadline, whichever comes first.
+PAGE_WORKERS = 6
+PAGE_MAX_BYTES = 512 * 1024
+PAGE_CONNECT_TIMEOUT = 3.05
+
+_page_pool = None
+_page_session = None
+_page_lock = threading.Lock()
+
+
+def page_fetcher():
+    # Shared thread pool and keep-alive session for result pages, created on first use.
+    global _page_pool, _page_session
+    with _page_lock:
+        if _page_pool is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            _page_pool = ThreadPoolExecutor(max_workers=PAGE_WORKERS, thread_name_prefix="page-fetch")
+            _page_session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=PAGE_WORKERS, pool_maxsize=PAGE_WORKERS)
+            _page_session.mount("http://", adapter)
+            _page_session.mount("https://", adapter)
+        return _page_pool, _page_session
+
+
+def response_encoding(response):
+    # requests falls back to ISO-8859-1 for text/* without a charset; pages are far more often UTF-8.
+    content_type = response.headers.get("Content-Type", "")
+    return response.encoding if "charset=" in content_type.lower() else "utf-8"
+
+
+def fetch_page(url, timeout=5, max_bytes=PAGE_MAX_BYTES, max_chars=4000):
+    """
+    Downloads one result page and returns {"url", "success", "text", "error",
+    "bytes", "seconds"}. The body is read in chunks and reading stops at
+    max_bytes, at the deadline (timeout seconds from now) or once max_chars of
+    text are extracted.
+    """
+    started = time.monotonic()
+    deadline = started + timeout
+    page = {"url": url, "success": False, "text": "", "error": None, "bytes": 0}
+    try:
+        _, session = page_fetcher()
+        with session.get(url, headers=HEADERS, timeout=(PAGE_CONNECT_TIMEOUT, timeout), stream=True) as response:
+            content_type = response.headers.get("Content-Type", "").lower()
+            if response.status_code != 200:
+                page["error"] = f"status code {response.status_code}"
+            elif "html" not in content_type and "text/plain" not in content_type:
+                page["error"] = f"not a web page ({content_type or 'no content type'})"
+            else:
+                decoder = codecs.getincrementaldecoder(response_encoding(response))(errors="replace")
+
+                def chunks():
+                    for chunk in response.iter_content(CHUNK_CHARS):
+                        page["bytes"] += len(chunk)
+                        yield decoder.decode(chunk)
+                        if page["bytes"] >= max_bytes or time.monotonic() > deadline:
+                            return
+
+                if "html" in content_type:
+                    page["text"] = extract_main_text(chunks(), max_chars)
+                else:
+                    page["text"] = "".join(chunks())[:max_chars]
+                page["success"] = bool(page["text"])
+                page["error"] = None if page["text"] else "no readable text"
+    except Exception as e:
+        page["error"] = str(e)
+    page["seconds"] = time.monotonic() - started
+    return page
+
+
+def fetch_pages(urls, timeout=5, enough_chars=8000, max_bytes=PAGE_MAX_BYTES, max_chars=4000):
+    """
+    Reads result pages in parallel and waits at most timeout seconds for all
+    of them, so the stage costs one slow page, not the sum. Returns as soon
+    as enough_chars of text have arrived.
+
+    Returns (pages, late, unneeded): {url: page} for pages read in time (see
+    fetch_page, failures included), the URLs that missed the timeout and the
+    URLs still downloading when enough text had arrived. Both kinds finish
+    in the background and are dropped.
+    """
+    pool, _ = page_fetcher()
+    futures = {pool.submit(fetch_page, url, timeout, max_bytes, max_chars): url for url in urls}
+    pages = {}
+    gathered = 0
+    enough = False
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            page = future.result()
+            pages[page["url"]] = page
+            gathered += len(page["text"])
+            if gathered >= enough_chars:
+                enough = True
+                break
+    except FuturesTimeoutError:
+        pass
+    pending = [url for url in urls if url not in pages]
+    return pages, ([] if enough else pending), (pending if enough else [])
+
+
+def normalize_url(url):
+    # Key under which the same page found by two engines is merged: scheme,
+    # "www.", trailing slash, fragment and tracking parameters do not count.
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    host = host[4:] if host.startswith("www.") else host
+    params = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+              if not k.startswith("utm_") and k not in ("gclid", "fbclid")]
+    path = parts.path.rstrip("/") or "/"
+    return host + path + (f"?{urlencode(params)}" if params else "")
+
+
+def engine_search(engine, query, max_results=3, search_timeout=10):
+    """
+    Results of one engine as [{"title", "snippet", "url"}], with a line or
+    two of debug text. Raises on any failure.
+    """
+    if engine == "DuckDuckGo API":
+        if not DDGS_AVAILABLE:
+            raise RuntimeError("duckduckgo_search is not installed")
+        with DDGS() as ddgs:
+            results = [{"title": r.get("title"), "snippet": r.get("body"), "url": r.get("href")}
+                       for r in ddgs.text(query, max_results=max_results)]
+        return results, f"Found {len(results)} results\n"
+    if engine == "DuckDuckGo":
+        search_url = f"https://duckduckgo.com/html/?q={quote_plus(query)}"
+    elif engine == "Google":
+        search_url = f"https://www.google.com/search?q={quote_plus(query)}"
+    else:
+        raise ValueError(f"Unknown search engine: {engine}")
+
+    import requests
+    # Streamed, so reading stops once max_results are parsed.
+    with requests.get(search_url, headers=HEADERS, timeout=search_timeout, stream=True) as response:
+        if response.status_code != 200:
+            raise RuntimeError(f"Search engine returned status code {response.status_code}")
+        response.encoding = response_encoding(response)
+        results, parsed = parse_results(engine, response.iter_content(CHUNK_CHARS, decode_unicode=True), max_results)
+    return results, f"URL: {search_url}\nParsed {len(results)} results from {parsed // 1024} KB of HTML\n"
+
+
+def _run_engine(engine, query, max_results, search_timeout, finished):
+    started = time.monotonic()
+    try:
+        results, _ = engine_search(engine, query, max_results, search_timeout)
+        finished.put((engine, results, None, time.monotonic() - started))
+    except Exception as e:
+        finished.put((engine, [], str(e), time.monotonic() - started))
 
-def perform_web_search(query, search_engine="DuckDuckGo", max_results=3, search_timeout=10):
+
+def fan_out_search(query, engines, max_results=3, search_timeout=10, quorum=None):
+    """
+    Queries every engine at once and merges their results, dropping the same
+    page found twice (see normalize_url). Returns as soon as quorum unique
+    results (default max_results) are in or search_timeout has passed;
+    slower engines keep running in daemon threads and are ignored.
+
+    Returns (results, debug); each result also names the engine that found it.
+    """
+    quorum = quorum or max_results
+    started = time.monotonic()
+    finished = queue.Queue()
+    for engine in engines:
+        threading.Thread(target=_run_engine, args=(engine, query, max_results, search_timeout, finished),
+                         name=f"search-{engine}", daemon=True).start()
+
+    merged, seen, lines, winner = [], set(), [], None
+    pending = list(engines)
+    while pending and len(merged) < quorum:
+        try:
+            engine, results, error, seconds = finished.get(timeout=max(search_timeout - (time.monotonic() - started), 0))
+        except queue.Empty:
+            break
+        pending.remove(engine)
+        if error:
+            lines.append(f"{engine}: failed in {seconds:.2f}s ({error})")
+            continue
+        new = 0
+        for result in results:
+            key = normalize_url(result["url"]) if result.get("url") else result.get("title")
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append({**result, "engine": engine})
+            new += 1
+        if results and winner is None:
+            winner = engine
+        lines.append(f"{engine}: {len(results)} results ({new} new) in {seconds:.2f}s")
+    reason = "quorum reached" if len(merged) >= quorum else f"no answer within {search_timeout}s"
+    lines.extend(f"{engine}: not waited for ({reason})" for engine in pending)
+    debug = (f"Fan-out over {', '.join(engines)} (quorum {quorum})\n"
+             f"First results from: {winner or 'no engine'}\n" + "\n".join(lines) +
+             f"\nMerged {len(merged)} unique results in {time.monotonic() - started:.2f}s\n\n")
+    return merged[:max_results], debug
+
+
+def perform_web_search(query, search_engine="DuckDuckGo", max_results=3, search_timeout=10, read_pages=0,
+                       page_timeout=5, page_chars=3000):
+    """
+    Searches the web and returns {"success", "results", "debug", "items"} with
+    the results formatted for the prompt and, on success, as a list of
+    {"title", "snippet", "url", "content"} (content: page text, if read). search_engine is one of ENGINES, or
+    ALL_ENGINES to query them all at once (see fan_out_search). With
+    read_pages, the top read_pages result pages are also downloaded (in
+    parallel, page_timeout seconds overall) and up to page_chars of each
+    page's text is added to its result.
+    """
     search_debug_info = f"Search query: \"{query}\"\n"
     search_debug_info += f"Search time: {datetime.datetime.now():%Y-%m-%d %H:%M:%S}\n"
     search_debug_info += f"Search engine: {search_engine}\n"
@@ -21,116 +245,61 @@ def perform_web_search(query, search_engine="DuckDuckGo", max_results=3, search_
     search_results = []
 
     try:
-        if search_engine == "DuckDuckGo API" and DDGS_AVAILABLE:
-            search_debug_info += "Using DuckDuckGo Search API\n"
-            try:
-                with DDGS() as ddgs:
-                    ddgs_results = list(ddgs.text(query, max_results=max_results))
-                    search_debug_info += f"Found {len(ddgs_results)} results\n\n"
-                    for i, result in enumerate(ddgs_results):
-                        title = result.get("title", "No title")
-                        body = result.get("body", "No content")
-                        href = result.get("href", "No URL")
-                        search_results.append(
-                            f"Result {i + 1}:\nTitle: {title}\nSnippet: {body}\nURL: {href}\n"
-                        )
-                        search_debug_info += f"Result {i + 1} - {title}\n"
-            except Exception as e:
-                error_msg = f"DuckDuckGo API error: {str(e)}"
-                search_debug_info += f"Error: {error_msg}\nFalling back to HTML scraping method\n"
-                search_engine = "DuckDuckGo"
-
-        if search_engine in ["DuckDuckGo", "Google"]:
-            if search_engine == "DuckDuckGo":
-                search_url = f"https://duckduckgo.com/html/?q={quote_plus(query)}"
-                search_debug_info += f"Using DuckDuckGo HTML scraping\nURL: {search_url}\n"
-            else:
-                search_url = f"https://www.google.com/search?q={quote_plus(query)}"
-                search_debug_info += f"Using Google HTML scraping\nURL: {search_url}\n"
-
-            headers = {
-                "User-Agent": (
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
-                    " AppleWebKit/537.36 (KHTML, like Gecko)"
-                    " Chrome/91.0.4472.124 Safari/537.36"
-                )
-            }
-            import requests
-            response = requests.get(search_url, headers=headers, timeout=search_timeout)
-            search_debug_info += f"Response status code: {response.status_code}\n"
-            if response.status_code != 200:
-                return {"results": f"Error: Search engine returned status code {response.status_code}",
-                        "debug": search_debug_info}
-
-            content = response.text
-
-            if search_engine == "DuckDuckGo":
-                result_divs = re.findall(
-                    r'<div class="result__body">(.*?)</div>\s*</div>', content, re.DOTALL
-                )
-                search_debug_info += f"Found {len(result_divs)} result divs in HTML\n\n"
-                for i, div in enumerate(result_divs[:max_results]):
-                    title_match = re.search(
-                        r'<a class="result__a" href=".*?">(.*?)</a>', div, re.DOTALL
-                    )
-                    title = (
-                        html.unescape(re.sub(r"<.*?>", "", title_match.group(1)))
-                        if title_match
-                        else "No title"
-                    )
-                    snippet_match = re.search(
-                        r'<a class="result__snippet".*?>(.*?)</a>', div, re.DOTALL
-                    )
-                    snippet = (
-                        html.unescape(re.sub(r"<.*?>", "", snippet_match.group(1)))
-                        if snippet_match
-                        else "No snippet"
-                    )
-                    url_match = re.search(
-                        r'<a class="result__a" href="(.*?)"', div, re.DOTALL
-                    )
-                    url = url_match.group(1) if url_match else "No URL"
-                    search_results.append(
-                        f"Result {i + 1}:\nTitle: {title}\nSnippet: {snippet}\nURL: {url}\n"
-                    )
-                    search_debug_info += f"Result {i + 1} - {title}\n"
-            elif search_engine == "Google":
-                result_divs = re.findall(
-                    r'<div class="g">(.*?)</div>\s*</div>\s*</div>', content, re.DOTALL
-                )
-                search_debug_info += f"Found {len(result_divs)} result divs in HTML\n\n"
-                for i, div in enumerate(result_divs[:max_results]):
-                    title_match = re.search(
-                        r'<h3 class=".*?">(.*?)</h3>', div, re.DOTALL
-                    )
-                    title = (
-                        html.unescape(re.sub(r"<.*?>", "", title_match.group(1)))
-                        if title_match
-                        else "No title"
-                    )
-                    snippet_match = re.search(
-                        r'<span class=".*?">(.*?)</span>', div, re.DOTALL
-                    )
-                    snippet = (
-                        html.unescape(re.sub(r"<.*?>", "", snippet_match.group(1)))
-                        if snippet_match
-                        else "No snippet"
-                    )
-                    url_match = re.search(r'<a href="(https?://.*?)"', div, re.DOTALL)
-                    url = url_match.group(1) if url_match else "No URL"
-                    search_results.append(
-                        f"Result {i + 1}:\nTitle: {title}\nSnippet: {snippet}\nURL: {url}\n"
-                    )
-                    search_debug_info += f"Result {i + 1} - {title}\n"
+        if search_engine == ALL_ENGINES:
+            engines = [e for e in ENGINES if e != "DuckDuckGo API" or DDGS_AVAILABLE]
+            search_results, debug = fan_out_search(query, engines, max_results, search_timeout)
+            search_debug_info += debug
+        else:
+            if search_engine == "DuckDuckGo API" and DDGS_AVAILABLE:
+                search_debug_info += "Using DuckDuckGo Search API\n"
+                try:
+                    search_results, debug = engine_search(search_engine, query, max_results, search_timeout)
+                    search_debug_info += debug + "\n"
+                except Exception as e:
+                    search_debug_info += f"Error: DuckDuckGo API error: {str(e)}\nFalling back to HTML scraping method\n"
+                    search_engine = "DuckDuckGo"
+            if search_engine in ["DuckDuckGo", "Google"]:
+                search_debug_info += f"Using {search_engine} HTML scraping\n"
+                search_results, debug = engine_search(search_engine, query, max_results, search_timeout)
+                search_debug_info += debug + "\n"
 
         if not search_results:
             search_debug_info += "No search results found.\n"
-            return {"results": "No search results found.", "debug": search_debug_info}
+            return {"success": False, "results": "No search results found.", "debug": search_debug_info}
+        for i, result in enumerate(search_results):
+            search_debug_info += f"Result {i + 1} - {result['title'] or 'No title'}\n"
+
+        pages = {}
+        urls = [r["url"] for r in search_results if (r["url"] or "").startswith(("http://", "https://"))][:read_pages]
+        if urls:
+            started = time.monotonic()
+            pages, late, unneeded = fetch_pages(urls, page_timeout, enough_chars=page_chars * len(urls), max_chars=page_chars)
+            search_debug_info += f"\nRead {sum(p['success'] for p in pages.values())} of {len(urls)} result pages " \
+                                 f"in {time.monotonic() - started:.2f}s\n"
+            for page in pages.values():
+                state = f"{len(page['text'])} chars" if page["success"] else f"failed ({page['error']})"
+                search_debug_info += f"  {page['url']}: {state}, {page['bytes'] // 1024} KB in {page['seconds']:.2f}s\n"
+            for url in late:
+                search_debug_info += f"  {url}: no answer within {page_timeout}s, skipped\n"
+            for url in unneeded:
+                search_debug_info += f"  {url}: still loading when enough page text had arrived, skipped\n"
+
+        formatted, items = [], []
+        for i, result in enumerate(search_results):
+            entry = (f"Result {i + 1}:\nTitle: {result['title'] or 'No title'}\n"
+                     f"Snippet: {result['snippet'] or 'No snippet'}\nURL: {result['url'] or 'No URL'}\n")
+            page = pages.get(result["url"])
+            content = page["text"] if page and page["success"] else ""
+            if content:
+                entry += f"Page content:\n{content}\n"
+            formatted.append(entry)
+            items.append({"title": result["title"], "snippet": result["snippet"], "url": result["url"],
+                          "content": content})
 
         search_debug_info += f"\nSearch completed successfully with {len(search_results)} results."
-        formatted_results = f"Web search results for: {query}\n\n" + "\n".join(search_results)
-        return {"results": formatted_results, "debug": search_debug_info}
+        formatted_results = f"Web search results for: {query}\n\n" + "\n".join(formatted)
+        return {"success": True, "results": formatted_results, "debug": search_debug_info, "items": items}
     except Exception as e:
         error_msg = f"Error performing web search: {str(e)}"
         search_debug_info += f"\n{error_msg}"
-        return {"results": error_msg, "debug": search_debug_info}
+        return {"success": False, "results": error_msg, "debug": search_debug_info}
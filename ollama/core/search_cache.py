@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future
+
+from .cache_store import LRUDiskCache, get_cache_dir
+
+
+def normalize_query(query):
+    # Case and spacing do not change what a search engine returns.
+    return " ".join(query.casefold().split())
+
+
+class SearchCache:
+    """
+    Web search results keyed by (engine, normalized query, max_results).
+
+    Results younger than ttl seconds are served as they are. Older ones, up to
+    stale_ttl, are still served at once while a background fetch refreshes
+    them (stale-while-revalidate). Concurrent lookups of the same key share
+    one in-flight fetch. Failed searches are never stored.
+    """
+
+    def __init__(self, path=None, ttl=15 * 60, stale_ttl=24 * 3600, max_memory_entries=128, max_disk_entries=2000):
+        path = path or os.path.join(get_cache_dir(), "search.sqlite3")
+        self.ttl = ttl
+        self.store = LRUDiskCache(path, max_memory_entries, max_disk_entries, max_age=stale_ttl)
+        self.stats = {"hits": 0, "stale": 0, "misses": 0, "shared": 0}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(engine, query, max_results):
+        material = json.dumps([engine, normalize_query(query), int(max_results)], separators=(",", ":"))
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def search(self, engine, query, max_results, fetch):
+        """
+        Returns fetch()'s result ({"success", "results", "debug"}) for the
+        query, from the cache when possible. The debug text starts with a
+        line saying whether it was a hit, a stale hit or a miss.
+        """
+        key = self.make_key(engine, query, max_results)
+        value, age = self.store.get(key)
+        if value is not None and age <= self.ttl:
+            self.stats["hits"] += 1
+            return self._annotate(value, f"Search cache: hit ({age:.0f}s old)")
+        if value is not None:
+            self.stats["stale"] += 1
+            self._fetch(key, fetch, background=True)
+            return self._annotate(value, f"Search cache: stale hit ({age:.0f}s old), refreshing in background")
+        future, shared = self._fetch(key, fetch)
+        self.stats["shared" if shared else "misses"] += 1
+        label = "miss, joined a search already in progress" if shared else "miss"
+        return self._annotate(future.result(), f"Search cache: {label}")
+
+    def _fetch(self, key, fetch, background=False):
+        # Returns (future, shared): the in-flight fetch for key, started if there is none.
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                return future, True
+            future = self._in_flight[key] = Future()
+        if background:
+            threading.Thread(target=self._run, args=(key, fetch, future), name="search-refresh", daemon=True).start()
+        else:
+            self._run(key, fetch, future)
+        return future, False
+
+    def _run(self, key, fetch, future):
+        try:
+            result = fetch()
+            if result.get("success"):
+                self.store.put(key, result)
+            future.set_result(result)
+        except Exception as e:
+            future.set_result({"success": False, "results": f"Error performing web search: {e}", "debug": str(e)})
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    @staticmethod
+    def _annotate(result, line):
+        return {**result, "debug": f"{line}\n{result.get('debug', '')}"}
+
+    def clear(self):
+        self.store.clear()
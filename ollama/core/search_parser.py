@@ -0,0 +1,272 @@
+import re
+from abc import ABC, abstractmethod
+from html.parser import HTMLParser
+from urllib.parse import unquote
+
+# Pages are fed in pieces of this many characters, and never more than
+# MAX_PAGE_CHARS in total, so a huge or malformed page costs bounded time.
+CHUNK_CHARS = 16 * 1024
+MAX_PAGE_CHARS = 1024 * 1024
+# Longest title or snippet kept.
+MAX_FIELD_CHARS = 1000
+
+CLASS_SEPARATOR = re.compile(r"\s+")
+WHITESPACE = re.compile(r"\s+")
+DDG_REDIRECT = re.compile(r"[?&]uddg=([^&]+)")
+GOOGLE_REDIRECT = re.compile(r"^/url\?(?:.*&)?q=([^&]+)")
+
+
+def clean_text(parts):
+    return WHITESPACE.sub(" ", "".join(parts)).strip()[:MAX_FIELD_CHARS]
+
+
+class ResultExtractor(HTMLParser, ABC):
+    """
+    Collects search results ({"title", "snippet", "url"}) from a results
+    page fed to it in pieces, and sets done once max_results are collected
+    so the caller can stop reading.
+
+    A result is the div carrying container_class; subclasses decide which
+    elements inside it hold the title, snippet and URL (start_field).
+    """
+
+    container_class = None
+
+    def __init__(self, max_results=3):
+        super().__init__(convert_charrefs=True)
+        self.max_results = max_results
+        self.results = []
+        self.done = False
+        self._div_depth = 0
+        self._result = None
+        self._result_depth = 0
+        self._field = None
+        self._field_tag = None
+        self._field_nesting = 0
+        self._text = []
+
+    def handle_starttag(self, tag, attrs):
+        if self.done or (self._result is None and tag != "div"):
+            return
+        attrs = dict(attrs)
+        classes = set(CLASS_SEPARATOR.split(attrs.get("class") or ""))
+        if tag == "div":
+            self._div_depth += 1
+            if self._result is None and self.container_class in classes:
+                self._result = {"title": "", "snippet": "", "url": ""}
+                self._result_depth = self._div_depth
+                return
+        if self._result is None:
+            return
+        if self._field is not None:
+            if tag == self._field_tag:
+                self._field_nesting += 1
+            return
+        self.start_field(tag, attrs, classes)
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+        if self._field is not None and tag == self._field_tag:
+            if self._field_nesting:
+                self._field_nesting -= 1
+            else:
+                self._end_field()
+        if tag == "div" and self._div_depth:
+            if self._result is not None and self._div_depth == self._result_depth:
+                self._end_result()
+            self._div_depth -= 1
+
+    def handle_data(self, data):
+        if self._field is not None:
+            self._text.append(data)
+
+    @abstractmethod
+    def start_field(self, tag, attrs, classes):
+        # Called for each element opened inside a result outside any field;
+        # calls self.capture() when the element holds the title or snippet.
+        pass
+
+    def capture(self, field, tag):
+        # Collects the text of the element just opened as field, unless it is already set.
+        if not self._result[field]:
+            self._field, self._field_tag, self._field_nesting, self._text = field, tag, 0, []
+
+    def _end_field(self):
+        self._result[self._field] = clean_text(self._text)
+        self._field = None
+
+    def _end_result(self):
+        if self._field is not None:
+            self._end_field()
+        if self._result["title"] or self._result["url"]:
+            self.results.append(self._result)
+            if len(self.results) >= self.max_results:
+                self.done = True
+        self._result = None
+
+
+class DuckDuckGoExtractor(ResultExtractor):
+    # duckduckgo.com/html: div.result__body > a.result__a (title) + .result__snippet
+    container_class = "result__body"
+
+    def start_field(self, tag, attrs, classes):
+        if tag == "a" and "result__a" in classes:
+            self._result["url"] = self._result["url"] or duckduckgo_target(attrs.get("href"))
+            self.capture("title", tag)
+        elif "result__snippet" in classes:
+            self.capture("snippet", tag)
+
+
+class GoogleExtractor(ResultExtractor):
+    # google.com/search: div.g > a[href] > h3 (title); the snippet is the
+    # known snippet block or else the first classed span after the title
+    # that is not part of the link (the link also holds the breadcrumb).
+    container_class = "g"
+    snippet_classes = {"VwiC3b", "st", "aCOpRe", "IsZvec"}
+
+    def __init__(self, max_results=3):
+        super().__init__(max_results)
+        self._link_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            self._link_depth += 1
+        super().handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag == "a" and self._link_depth:
+            self._link_depth -= 1
+        super().handle_endtag(tag)
+
+    def start_field(self, tag, attrs, classes):
+        if tag == "a" and not self._result["url"]:
+            self._result["url"] = google_target(attrs.get("href"))
+        if tag == "h3":
+            self.capture("title", tag)
+        elif classes & self.snippet_classes or (tag == "span" and attrs.get("class") and self._result["title"]
+                                                and not self._link_depth):
+            self.capture("snippet", tag)
+
+
+EXTRACTORS = {
+    "DuckDuckGo": DuckDuckGoExtractor,
+    "Google": GoogleExtractor,
+}
+
+
+def duckduckgo_target(href):
+    # Result links go through a //duckduckgo.com/l/?uddg=<url> redirect.
+    if not href:
+        return ""
+    match = DDG_REDIRECT.search(href)
+    if match:
+        return unquote(match.group(1))
+    return "https:" + href if href.startswith("//") else href
+
+
+def google_target(href):
+    # Plain result links, or /url?q=<url>&... redirects; anything else (Google's own pages) is skipped.
+    if not href:
+        return ""
+    match = GOOGLE_REDIRECT.match(href)
+    if match:
+        return unquote(match.group(1))
+    return href if href.startswith(("http://", "https://")) else ""
+
+
+def parse_results(engine, page, max_results=3, max_chars=MAX_PAGE_CHARS):
+    """
+    Extracts up to max_results results from a results page of engine (a key
+    of EXTRACTORS). page is the whole text or an iterable of text chunks, e.g.
+    a streamed response body; reading stops as soon as enough results are
+    collected or max_chars have been parsed.
+
+    Returns (results, chars_parsed).
+    """
+    extractor = EXTRACTORS[engine](max_results)
+    parsed = feed(extractor, page, max_chars)
+    return extractor.results, parsed
+
+
+def feed(extractor, page, max_chars):
+    # Feeds page (text or text chunks) until extractor.done or max_chars; returns the characters fed.
+    if isinstance(page, str):
+        text = page
+        page = (text[i:i + CHUNK_CHARS] for i in range(0, len(text), CHUNK_CHARS))
+    parsed = 0
+    for chunk in page:
+        chunk = chunk[:max_chars - parsed]
+        extractor.feed(chunk)
+        parsed += len(chunk)
+        if extractor.done or parsed >= max_chars:
+            break
+    if not extractor.done:
+        extractor.close()
+    return parsed
+
+
+# Page text: elements that never hold the main text, and elements that end a line.
+SKIP_TAGS = {"script", "style", "noscript", "svg", "nav", "header", "footer", "aside", "form", "iframe",
+             "template", "button", "select", "figure"}
+BLOCK_TAGS = {"p", "div", "li", "br", "tr", "td", "th", "dd", "dt", "pre", "blockquote", "section", "article",
+              "main", "h1", "h2", "h3", "h4", "h5", "h6", "table", "ul", "ol"}
+# Shorter lines are taken for menus, buttons and captions.
+MIN_LINE_WORDS = 6
+
+
+class TextExtractor(HTMLParser):
+    """
+    Collects the readable text of a page: text outside navigation, scripts
+    and similar chrome, one line per block element. Sets done once about
+    max_chars of text are collected.
+    """
+
+    def __init__(self, max_chars=4000):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.lines = []
+        self.length = 0
+        self.done = False
+        self._skip_depth = 0
+        self._line = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._end_line()
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            if self._skip_depth:
+                self._skip_depth -= 1
+        elif tag in BLOCK_TAGS:
+            self._end_line()
+
+    def handle_data(self, data):
+        if not self._skip_depth and not self.done:
+            self._line.append(data)
+
+    def _end_line(self):
+        line = WHITESPACE.sub(" ", "".join(self._line)).strip()
+        self._line = []
+        if len(line.split()) >= MIN_LINE_WORDS and not self.done:
+            self.lines.append(line)
+            self.length += len(line) + 1
+            self.done = self.length >= self.max_chars
+
+    def text(self):
+        self._end_line()
+        return "\n".join(self.lines)[:self.max_chars]
+
+
+def extract_main_text(page, max_chars=4000, max_input_chars=MAX_PAGE_CHARS):
+    """
+    Readable text of an HTML page, at most max_chars long. page is the whole
+    text or an iterable of text chunks; reading stops once enough text is
+    collected or max_input_chars have been parsed.
+    """
+    extractor = TextExtractor(max_chars)
+    feed(extractor, page, max_input_chars)
+    return extractor.text()
@@ -0,0 +1,128 @@
+import importlib.util
+import threading
+import time
+
+try:
+    import faiss
+    import numpy as np
+
+    # sentence-transformers pulls in torch, which takes seconds to import;
+    # only check it is there and import it on first use.
+    SEMANTIC_CACHE_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+except ImportError:
+    SEMANTIC_CACHE_AVAILABLE = False
+
+
+class _Namespace:
+    # Question embeddings and answers for one model.
+    def __init__(self, dim):
+        self.index = faiss.IndexIDMap(faiss.IndexFlatIP(dim))
+        self.entries = {}
+        self.next_id = 0
+
+
+class SemanticCache:
+    """
+    Answers a question with a stored answer to a sufficiently similar earlier
+    question for the same model. Questions are embedded with the same
+    SentenceTransformer as the local KB and compared by cosine similarity.
+
+    Each model has its own namespace holding at most max_entries_per_model
+    entries (least recently hit evicted first); entries older than max_age
+    seconds are ignored and dropped.
+    """
+
+    def __init__(self, threshold=0.92, max_entries_per_model=1000, max_age=7 * 24 * 3600,
+                 embedding_model_name="all-MiniLM-L6-v2"):
+        if not SEMANTIC_CACHE_AVAILABLE:
+            raise RuntimeError("Semantic cache needs faiss, numpy and sentence-transformers.")
+        self.threshold = threshold
+        self.max_entries_per_model = max_entries_per_model
+        self.max_age = max_age
+        self.embedding_model_name = embedding_model_name
+        self.namespaces = {}
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def embed(self, text):
+        from local_retriever import get_embedding_model
+        model = get_embedding_model(self.embedding_model_name)
+        vector = model.encode([text], convert_to_numpy=True, normalize_embeddings=True)
+        return np.asarray(vector, dtype="float32")
+
+    def _model_stats(self, model):
+        return self.stats.setdefault(model, {"hits": 0, "misses": 0, "saved_seconds": 0.0})
+
+    def lookup(self, model, question):
+        """
+        Returns (answer, similarity) for the closest stored question at or
+        above the threshold, or (None, best_similarity) on a miss.
+        """
+        vector = self.embed(question)
+        now = time.time()
+        with self._lock:
+            stats = self._model_stats(model)
+            namespace = self.namespaces.get(model)
+            if namespace is None or namespace.index.ntotal == 0:
+                stats["misses"] += 1
+                return None, 0.0
+            scores, ids = namespace.index.search(vector, min(5, namespace.index.ntotal))
+            best = 0.0
+            expired = []
+            for score, entry_id in zip(scores[0], ids[0]):
+                entry = namespace.entries.get(int(entry_id))
+                if entry is None:
+                    continue
+                if now - entry["created"] > self.max_age:
+                    expired.append(int(entry_id))
+                    continue
+                best = max(best, float(score))
+                if score >= self.threshold:
+                    entry["last_hit"] = now
+                    stats["hits"] += 1
+                    stats["saved_seconds"] += entry["cost"]
+                    self._remove(namespace, expired)
+                    return entry["answer"], float(score)
+            self._remove(namespace, expired)
+            stats["misses"] += 1
+            return None, best
+
+    def put(self, model, question, answer, cost=0.0):
+        """
+        Stores an answer. cost is what producing it took (seconds) and is
+        credited to saved_seconds on every later hit.
+        """
+        vector = self.embed(question)
+        now = time.time()
+        with self._lock:
+            namespace = self.namespaces.get(model)
+            if namespace is None:
+                namespace = self.namespaces[model] = _Namespace(vector.shape[1])
+            entry_id = namespace.next_id
+            namespace.next_id += 1
+            namespace.index.add_with_ids(vector, np.array([entry_id], dtype="int64"))
+            namespace.entries[entry_id] = {
+                "question": question,
+                "answer": answer,
+                "created": now,
+                "last_hit": now,
+                "cost": cost,
+            }
+            overflow = len(namespace.entries) - self.max_entries_per_model
+            if overflow > 0:
+                oldest = sorted(namespace.entries, key=lambda i: namespace.entries[i]["last_hit"])[:overflow]
+                self._remove(namespace, oldest)
+
+    def clear(self, model=None):
+        with self._lock:
+            if model is None:
+                self.namespaces.clear()
+            else:
+                self.namespaces.pop(model, None)
+
+    def _remove(self, namespace, entry_ids):
+        if not entry_ids:
+            return
+        namespace.index.remove_ids(np.array(entry_ids, dtype="int64"))
+        for entry_id in entry_ids:
+            namespace.entries.pop(entry_id, None)
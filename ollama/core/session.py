@@ -1,6 +1,35 @@
 import os
 import json
+import time
 import datetime
+import threading
+import uuid
+
+# In-memory per-session state (the Ollama KV context, journal bookkeeping) that is never written to disk.
+TRANSIENT_KEYS = ("context", "context_model", "journal_entries")
+
+# A session is stored as a snapshot (<id>.json, written whole and atomically)
+# plus a journal (<id>.jsonl) with one line per message added since. Adding a
+# message appends one line; once the journal holds as many entries as half the
+# snapshot's messages (at least COMPACT_MIN), it is folded into a new snapshot,
+# so the rewrite cost per message stays constant on average.
+COMPACT_MIN = 64
+# "always": fsync every journal line; "interval": at most every FSYNC_INTERVAL
+# seconds per session; "never": leave it to the OS.
+FSYNC_POLICY = "always"
+FSYNC_INTERVAL = 1.0
+
+# Headers of all stored sessions live in <sessions>/.catalog (see
+# SessionCatalog), so listing sessions never reads message bodies.
+CATALOG_DIR = ".catalog"
+CATALOG_COMPACT_MIN = 256
+HEADER_KEYS = ("id", "title", "model", "created_at", "updated_at")
+
+_session_locks = {}
+_session_locks_lock = threading.Lock()
+_last_fsync = {}
+_catalogs = {}
+_catalogs_lock = threading.Lock()
 
 def get_sessions_dir():
     base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -9,10 +38,25 @@ def get_sessions_dir():
         os.makedirs(sessions_dir)
     return sessions_dir
 
+def session_lock(session_id):
+    # One lock per session, so appends (and their fsync) to different sessions run in parallel.
+    with _session_locks_lock:
+        lock = _session_locks.get(session_id)
+        if lock is None:
+            lock = _session_locks[session_id] = threading.Lock()
+        return lock
+
 def new_session(current_model):
     sessions_dir = get_sessions_dir()
-    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-    session_id = f"session_{timestamp}"
+    while True:
+        # Random suffix: API clients can create several sessions within the same second.
+        session_id = f"session_{datetime.datetime.now():%Y%m%d%H%M%S}_{uuid.uuid4().hex[:8]}"
+        try:
+            # Claims the id; the snapshot below replaces this empty file.
+            os.close(os.open(os.path.join(sessions_dir, f"{session_id}.json"), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            continue
     session = {
         "id": session_id,
         "title": f"Session {datetime.datetime.now():%Y-%m-%d %H:%M}",
@@ -21,39 +65,70 @@ def new_session(current_model):
         "created_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "updated_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
     }
-    session_file = os.path.join(sessions_dir, f"{session_id}.json")
-    with open(session_file, "w", encoding="utf-8") as f:
-        json.dump(session, f, indent=2)
+    write_snapshot(session, sessions_dir)
+    get_catalog(sessions_dir).update(session)
     return session_id, session
 
+def write_snapshot(session, sessions_dir):
+    # Written to a temporary file and renamed over the old snapshot, so a crash leaves one or the other.
+    session_file = os.path.join(sessions_dir, f"{session['id']}.json")
+    stored = {key: value for key, value in session.items() if key not in TRANSIENT_KEYS}
+    temp_file = f"{session_file}.tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(stored, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_file, session_file)
+
 def save_session(session, sessions_dir=None):
+    # Full rewrite: folds the journal into the snapshot (also used for header changes such as the title).
     if not sessions_dir:
         sessions_dir = get_sessions_dir()
-    session["updated_at"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    session_file = os.path.join(sessions_dir, f"{session['id']}.json")
-    with open(session_file, "w", encoding="utf-8") as f:
-        json.dump(session, f, indent=2)
+    with session_lock(session["id"]):
+        session["updated_at"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        write_snapshot(session, sessions_dir)
+        # Only after the snapshot is in place; replay skips entries it already holds.
+        journal_file = os.path.join(sessions_dir, f"{session['id']}.jsonl")
+        if os.path.exists(journal_file):
+            os.remove(journal_file)
+        session["journal_entries"] = 0
+    get_catalog(sessions_dir).update(session)
 
-def load_sessions():
-    sessions = {}
-    sessions_dir = get_sessions_dir()
-    session_files = [f for f in os.listdir(sessions_dir) if f.endswith(".json")]
-    for file in session_files:
-        try:
-            with open(os.path.join(sessions_dir, file), "r", encoding="utf-8") as f:
-                session_data = json.load(f)
-                sessions[session_data["id"]] = session_data
-        except Exception as e:
-            print(f"Error loading session {file}: {str(e)}")
-    return sessions
+def replay_journal(session, journal_file):
+    # Applies journal entries the snapshot does not hold yet; a line cut short by a crash
+    # is skipped (the next append starts on a fresh line, see append_journal).
+    entries = 0
+    try:
+        with open(journal_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                entries += 1
+                if entry.get("seq", 0) < len(session["messages"]):
+                    continue
+                session["messages"].append(entry["message"])
+                session["updated_at"] = entry.get("updated_at", session.get("updated_at"))
+    except FileNotFoundError:
+        pass
+    session["journal_entries"] = entries
+    return session
+
+def read_session(sessions_dir, session_id):
+    with open(os.path.join(sessions_dir, f"{session_id}.json"), "r", encoding="utf-8") as f:
+        session_data = json.load(f)
+    session_data.setdefault("messages", [])
+    return replay_journal(session_data, os.path.join(sessions_dir, f"{session_id}.jsonl"))
+
+def load_catalog():
+    # {id: header} of every stored session; kept up to date as sessions are written.
+    return get_catalog().headers
 
 def load_session(session_id):
     sessions_dir = get_sessions_dir()
-    session_file = os.path.join(sessions_dir, f"{session_id}.json")
     try:
-        with open(session_file, "r", encoding="utf-8") as f:
-            session_data = json.load(f)
-            return session_data
+        return read_session(sessions_dir, session_id)
     except Exception as e:
         print(f"Error loading session {session_id}: {str(e)}")
         return None
@@ -64,6 +139,12 @@ def delete_session(session_id):
     try:
         if os.path.exists(session_file):
             os.remove(session_file)
+            journal_file = os.path.join(sessions_dir, f"{session_id}.jsonl")
+            if os.path.exists(journal_file):
+                os.remove(journal_file)
+            get_catalog(sessions_dir).remove(session_id)
+            with _session_locks_lock:
+                _session_locks.pop(session_id, None)
             return True
     except Exception as e:
         print(f"Error deleting session {session_id}: {str(e)}")
@@ -86,10 +167,185 @@ def export_session(session, file_path):
         print(f"Error exporting session: {str(e)}")
         return False
 
-def store_message_in_session(session, role, message):
-    session["messages"].append({"role": role, "content": message})
-    save_session(session)
+def store_message_in_session(session, role, message, metrics=None, sessions_dir=None):
+    # Appends one journal line (constant time); compacts now and then.
+    entry = {"role": role, "content": message}
+    if metrics:
+        entry["metrics"] = metrics
+    if not sessions_dir:
+        sessions_dir = get_sessions_dir()
+    with session_lock(session["id"]):
+        updated_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        record = {"seq": len(session["messages"]), "message": entry, "updated_at": updated_at}
+        append_journal(session["id"], os.path.join(sessions_dir, f"{session['id']}.jsonl"), record)
+        session["messages"].append(entry)
+        session["updated_at"] = updated_at
+        session["journal_entries"] = session.get("journal_entries", 0) + 1
+        compact = session["journal_entries"] >= max(COMPACT_MIN, len(session["messages"]) // 2)
+    if compact:
+        save_session(session, sessions_dir)
+    else:
+        get_catalog(sessions_dir).update(session)
+
+def append_journal(session_id, journal_file, record):
+    line = (json.dumps(record) + "\n").encode("utf-8")
+    with open(journal_file, "a+b") as f:
+        # A crash mid-append leaves a last line without its newline; end it first,
+        # so this record is not glued onto the fragment and lost with it.
+        if f.seek(0, os.SEEK_END):
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                line = b"\n" + line
+        f.write(line)
+        f.flush()
+        sync_journal(session_id, f)
+
+def sync_journal(session_id, f):
+    if FSYNC_POLICY == "always":
+        os.fsync(f.fileno())
+    elif FSYNC_POLICY == "interval":
+        now = time.monotonic()
+        if now - _last_fsync.get(session_id, 0) >= FSYNC_INTERVAL:
+            os.fsync(f.fileno())
+            _last_fsync[session_id] = now
 
 def get_session_messages(session):
     return session.get("messages", [])
+
+def session_header(session, mtime_ns=0):
+    header = {key: session.get(key) for key in HEADER_KEYS}
+    header["message_count"] = len(session.get("messages", []))
+    header["mtime_ns"] = mtime_ns
+    return header
+
+def session_mtime(sessions_dir, session_id):
+    # Last change to the snapshot or the journal, 0 if neither exists.
+    mtime_ns = 0
+    for suffix in (".json", ".jsonl"):
+        try:
+            mtime_ns = max(mtime_ns, os.stat(os.path.join(sessions_dir, session_id + suffix)).st_mtime_ns)
+        except FileNotFoundError:
+            pass
+    return mtime_ns
+
+def get_catalog(sessions_dir=None):
+    if not sessions_dir:
+        sessions_dir = get_sessions_dir()
+    with _catalogs_lock:
+        catalog = _catalogs.get(sessions_dir)
+        if catalog is None:
+            catalog = _catalogs[sessions_dir] = SessionCatalog(sessions_dir)
+            catalog.load()
+    return catalog
+
+class SessionCatalog:
+    """
+    Headers of the stored sessions ({id: session_header()}: id, title, model,
+    timestamps, message count and the files' mtime), stored like the sessions
+    themselves: a snapshot (catalog.json) plus a journal of changed headers
+    (catalog.jsonl), compacted once it holds half as many entries as there
+    are sessions. Message bodies are never read at startup.
+
+    load() also stats the session files (one scandir, no parsing) and rereads
+    only the sessions whose files' mtime differs from their header's: sessions
+    added, removed or changed by another program, a lost catalog record, or a
+    missing catalog.
+    """
+
+    def __init__(self, sessions_dir):
+        self.sessions_dir = sessions_dir
+        self.path = os.path.join(sessions_dir, CATALOG_DIR)
+        self.snapshot_file = os.path.join(self.path, "catalog.json")
+        self.journal_file = os.path.join(self.path, "catalog.jsonl")
+        self.headers = {}
+        self.journal_entries = 0
+        self._lock = threading.Lock()
+
+    def load(self):
+        os.makedirs(self.path, exist_ok=True)
+        with self._lock:
+            # Updated in place: callers hold on to self.headers.
+            self.headers.clear()
+            try:
+                with open(self.snapshot_file, "r", encoding="utf-8") as f:
+                    snapshot = json.load(f)
+                self.headers.update(snapshot["sessions"])
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+            self.journal_entries = 0
+            try:
+                with open(self.journal_file, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+                        if entry.get("header") is None:
+                            self.headers.pop(entry.get("id"), None)
+                        else:
+                            self.headers[entry["id"]] = entry["header"]
+                        self.journal_entries += 1
+            except FileNotFoundError:
+                pass
+            if self._reconcile() or not os.path.exists(self.snapshot_file):
+                self._compact()
+        return self.headers
+
+    def update(self, session):
+        mtime_ns = session_mtime(self.sessions_dir, session["id"])
+        self._record(session["id"], session_header(session, mtime_ns))
+
+    def remove(self, session_id):
+        self._record(session_id, None)
+
+    def _record(self, session_id, header):
+        with self._lock:
+            if header is None:
+                self.headers.pop(session_id, None)
+            else:
+                self.headers[session_id] = header
+            # Not fsynced: a lost line is caught by the mtime check on the next load.
+            record = {"id": session_id, "header": header}
+            with open(self.journal_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+            self.journal_entries += 1
+            if self.journal_entries >= max(CATALOG_COMPACT_MIN, len(self.headers) // 2):
+                self._compact()
+
+    def _reconcile(self):
+        # Rereads the sessions whose files changed since their header was recorded; returns how many changed.
+        mtimes = {}
+        changed = 0
+        with os.scandir(self.sessions_dir) as entries:
+            for entry in entries:
+                session_id, suffix = os.path.splitext(entry.name)
+                if suffix in (".json", ".jsonl") and entry.is_file():
+                    mtimes[session_id] = max(mtimes.get(session_id, 0), entry.stat().st_mtime_ns)
+        for session_id in list(self.headers):
+            if session_id not in mtimes:
+                del self.headers[session_id]
+                changed += 1
+        for session_id, mtime_ns in mtimes.items():
+            header = self.headers.get(session_id)
+            if header is not None and header.get("mtime_ns") == mtime_ns:
+                continue
+            changed += 1
+            try:
+                self.headers[session_id] = session_header(read_session(self.sessions_dir, session_id), mtime_ns)
+            except Exception as e:
+                self.headers.pop(session_id, None)
+                # An empty snapshot is an id new_session has claimed but not written yet.
+                session_file = os.path.join(self.sessions_dir, f"{session_id}.json")
+                if os.path.exists(session_file) and os.path.getsize(session_file):
+                    print(f"Error loading session {session_id}: {str(e)}")
+        return changed
+
+    def _compact(self):
+        temp_file = f"{self.snapshot_file}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump({"sessions": self.headers}, f)
+        os.replace(temp_file, self.snapshot_file)
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+        self.journal_entries = 0
 # This file was created by the setup script
@@ -7,7 +7,8 @@ class ChatInterface:
         parent,
         on_send_callback,
         on_new_session_callback,
-        on_update_search_settings_callback
+        on_update_search_settings_callback,
+        on_stop_callback=None
     ):
         """
         :param parent: The parent widget/frame.
@@ -15,11 +16,13 @@ class ChatInterface:
         :param on_new_session_callback: function() -> None.
         :param on_update_search_settings_callback: function(bool, bool, bool) -> None.
             (Parameters: web_search_enabled, show_web_debug, show_kb_debug)
+        :param on_stop_callback: function() -> None. Stops the answer being generated.
         """
         self.parent = parent
         self.on_send_callback = on_send_callback
         self.on_new_session_callback = on_new_session_callback
         self.on_update_search_settings_callback = on_update_search_settings_callback
+        self.on_stop_callback = on_stop_callback
 
         # Variables for checkboxes.
         self.web_search_enabled = tk.BooleanVar(value=True)
@@ -112,6 +115,16 @@ class ChatInterface:
         )
         self.send_button.pack(side=tk.RIGHT)
 
+        # "Stop" button.
+        if self.on_stop_callback:
+            self.stop_button = ttk.Button(
+                button_frame,
+                text="Stop ⏹",
+                style="danger.TButton",
+                command=self.on_stop_callback
+            )
+            self.stop_button.pack(side=tk.RIGHT, padx=5)
+
         # "New Session" button.
         self.new_session_button = ttk.Button(
             button_frame,
@@ -149,6 +162,24 @@ class ChatInterface:
         self.chat_display.see(tk.END)
         self.chat_display.config(state=tk.DISABLED)
 
+    def begin_streamed_message(self, sender, tag=None):
+        # Opens a message whose body is filled in by append_to_streamed_message.
+        # A mark tracks the end of the body so other messages can still be
+        # inserted after it while tokens arrive.
+        self.chat_display.config(state=tk.NORMAL)
+        self.chat_display.insert(tk.END, f"\n{sender}: \n\n", tag)
+        self.chat_display.mark_set("stream_end", "end-3c")
+        self.chat_display.mark_gravity("stream_end", tk.RIGHT)
+        self.chat_display.see(tk.END)
+        self.chat_display.config(state=tk.DISABLED)
+        self.stream_tag = tag
+
+    def append_to_streamed_message(self, text):
+        self.chat_display.config(state=tk.NORMAL)
+        self.chat_display.insert("stream_end", text, self.stream_tag)
+        self.chat_display.see("stream_end")
+        self.chat_display.config(state=tk.DISABLED)
+
     def display_search_info(self, info):
         self.display_message("🔍", info, tag="search_info")
 
@@ -1,7 +1,6 @@
 import tkinter as tk
 import ttkbootstrap as tb
 from ttkbootstrap.constants import *
-import threading
 import sys, os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
@@ -38,7 +37,8 @@ class OllamaApp:
             self.chat_frame,
             self.process_message,
             self.new_session,
-            self.update_search_settings  # This callback receives three booleans.
+            self.update_search_settings,  # This callback receives three booleans.
+            self.stop_generation
         )
 
         # Create SettingsPanel.
@@ -54,39 +54,76 @@ class OllamaApp:
         self.new_session()
 
     def start_background_tasks(self):
-        threading.Thread(target=self.refresh_models, daemon=True).start()
-        threading.Thread(target=self.check_server_connection, daemon=True).start()
+        # Served from the model registry cache when it is fresh.
+        self.core_manager.model_registry.subscribe(self.on_server_status)
+        self.core_manager.refresh_models(force=False)
+
+    def run_on_loop(self, coro, on_done):
+        # Runs coro on the CoreManager event loop and delivers its result to
+        # on_done(result) on the Tk thread; if coro raises, on_done gets an
+        # error result instead, so the UI never waits on a lost exception.
+        future = self.core_manager.submit(coro)
+        future.add_done_callback(lambda f: self.root.after(0, on_done, self.loop_result(f)))
+        return future
+
+    @staticmethod
+    def loop_result(future):
+        if future.cancelled():
+            return {"success": False, "cancelled": True, "error": "Cancelled."}
+        error = future.exception()
+        if error is not None:
+            return {"success": False, "error": str(error) or type(error).__name__}
+        return future.result()
 
     def refresh_models(self):
-        models = self.core_manager.get_models()
-        if models:
-            self.settings_panel.model_combo['values'] = models
-            if not self.core_manager.current_model:
-                self.core_manager.current_model = models[0]
-                self.settings_panel.model_combo.set(models[0])
-
-    def check_server_connection(self):
-        is_connected = self.core_manager.check_server_connection()
+        self.core_manager.refresh_models()
+
+    def on_server_status(self, models, is_connected):
+        # Called from the registry's refresh thread.
         # Optionally update a status indicator here.
+        pass
 
     def process_message(self, user_input):
-        def task():
-            with_search = True
-            response_data = self.core_manager.generate_response(user_input, with_search=with_search)
-            if response_data.get("success"):
-                response = response_data.get("ai_response", "")
-                self.chat_interface.display_message("🤖 AI", response, tag="ai")
-                self.core_manager.store_message_in_session("assistant", response)
-            else:
-                error = response_data.get("error", "Unknown error")
-                self.chat_interface.display_error(error)
-            # Display web debug info if enabled.
-            if self.core_manager.search_debug_info and self.core_manager.show_web_debug:
-                self.chat_interface.display_search_info(self.core_manager.search_debug_info)
-            # Display KB debug info if available and enabled.
-            if response_data.get("kb_debug_info") and self.core_manager.show_kb_debug:
-                self.chat_interface.display_search_info(response_data.get("kb_debug_info"))
-        threading.Thread(target=task, daemon=True).start()
+        self.core_manager.store_message_in_session("user", user_input)
+        with_search = True
+        streamed = []
+
+        def on_token(token):
+            # Called on the event loop thread; hand every fragment to the Tk thread.
+            if not streamed:
+                self.root.after(0, self.chat_interface.begin_streamed_message, "🤖 AI", "ai")
+            streamed.append(token)
+            self.root.after(0, self.chat_interface.append_to_streamed_message, token)
+
+        self.run_on_loop(
+            self.core_manager.agenerate_response(user_input, with_search=with_search, on_token=on_token),
+            lambda response_data: self.show_response(response_data, streamed),
+        )
+
+    def show_response(self, response_data, streamed):
+        if response_data.get("success"):
+            response = response_data.get("ai_response", "")
+            if not streamed:
+                sender = "🤖 AI (cached)" if response_data.get("cached") else "🤖 AI"
+                self.chat_interface.display_message(sender, response, tag="ai")
+            metrics = None if response_data.get("cached") else response_data.get("metrics")
+            self.core_manager.store_message_in_session("assistant", response, metrics)
+            self.settings_panel.refresh_metrics()
+        elif response_data.get("cancelled"):
+            # Keep whatever was streamed; just say why it stopped.
+            self.chat_interface.set_progress_text(f"⏹ {response_data.get('error')}")
+        else:
+            error = response_data.get("error", "Unknown error")
+            self.chat_interface.display_error(error)
+        # Display web debug info if enabled.
+        if self.core_manager.search_debug_info and self.core_manager.show_web_debug:
+            self.chat_interface.display_search_info(self.core_manager.search_debug_info)
+        # Display KB debug info if available and enabled.
+        if response_data.get("kb_debug_info") and self.core_manager.show_kb_debug:
+            self.chat_interface.display_search_info(response_data.get("kb_debug_info"))
+
+    def stop_generation(self):
+        self.core_manager.cancel_generation()
 
     def new_session(self):
         session_id = self.core_manager.new_session()
@@ -1,6 +1,8 @@
 import tkinter as tk
 from tkinter import ttk
 
+from ollama.core.search import ALL_ENGINES, ENGINES
+
 
 class SettingsPanel:
     def __init__(self, parent, core_manager, on_refresh_models):
@@ -18,16 +20,55 @@ class SettingsPanel:
         self.model_combo = ttk.Combobox(model_frame)
         self.model_combo.pack(fill=tk.X)
         self.model_combo.bind("<<ComboboxSelected>>", self.model_selected)
+        self.model_status_label = ttk.Label(model_frame, text="Model status: not loaded", font=("Segoe UI", 9))
+        self.model_status_label.pack(anchor=tk.W)
+        self.core_manager.on_model_status = self.on_model_status
+        self.core_manager.model_registry.subscribe(self.on_models_changed)
+        self.set_models(self.core_manager.model_registry.cached_models())
 
         self.refresh_models_btn = ttk.Button(model_frame, text="Refresh Models", command=self.on_refresh_models)
         self.refresh_models_btn.pack(pady=5)
 
+        # Response cache (opt-in).
+        self.response_cache_var = tk.BooleanVar(value=self.core_manager.response_cache_enabled)
+        ttk.Checkbutton(model_frame, text="Reuse cached answers", variable=self.response_cache_var,
+                        command=self.update_cache_settings).pack(anchor=tk.W)
+        self.force_cache_var = tk.BooleanVar(value=self.core_manager.force_response_cache)
+        ttk.Checkbutton(model_frame, text="Cache even when temperature > 0", variable=self.force_cache_var,
+                        command=self.update_cache_settings).pack(anchor=tk.W)
+        self.semantic_cache_var = tk.BooleanVar(value=self.core_manager.semantic_cache_enabled)
+        ttk.Checkbutton(model_frame, text="Reuse answers to similar questions", variable=self.semantic_cache_var,
+                        command=self.update_cache_settings).pack(anchor=tk.W)
+
+        # Per-model inference metrics (seconds unless noted).
+        metrics_frame = ttk.LabelFrame(self.frame, text="Model Metrics")
+        metrics_frame.pack(fill=tk.X, padx=5, pady=5)
+        columns = ("requests", "latency", "ttft", "tps", "load")
+        self.metrics_tree = ttk.Treeview(metrics_frame, columns=columns, height=4)
+        self.metrics_tree.heading("#0", text="Model")
+        self.metrics_tree.column("#0", width=110)
+        for column, heading in zip(columns, ("Runs", "Latency p50/p95", "TTFT p50/p95", "Tok/s p50", "Load p50")):
+            self.metrics_tree.heading(column, text=heading)
+            self.metrics_tree.column(column, width=80, anchor=tk.E)
+        self.metrics_tree.pack(fill=tk.X)
+        ttk.Button(metrics_frame, text="Refresh Metrics", command=self.refresh_metrics).pack(pady=5)
+        self.refresh_metrics()
+
+        # Local knowledge base.
+        kb_frame = ttk.LabelFrame(self.frame, text="Local Knowledge Base")
+        kb_frame.pack(fill=tk.X, padx=5, pady=5)
+        self.kb_status_label = ttk.Label(kb_frame, text="", font=("Segoe UI", 9))
+        self.kb_status_label.pack(anchor=tk.W)
+        ttk.Button(kb_frame, text="Manage Knowledge Base", command=self.open_kb_manager).pack(pady=5)
+        self.show_kb_status()
+
         # Search settings
         search_frame = ttk.LabelFrame(self.frame, text="Web Search Settings")
         search_frame.pack(fill=tk.X, padx=5, pady=5)
         ttk.Label(search_frame, text="Search Engine:").pack(anchor=tk.W)
-        self.search_engine_combo = ttk.Combobox(search_frame, values=["DuckDuckGo", "DuckDuckGo API", "Google"])
+        self.search_engine_combo = ttk.Combobox(search_frame, values=ENGINES + [ALL_ENGINES])
         self.search_engine_combo.current(0)
+        self.search_engine_combo.bind("<<ComboboxSelected>>", lambda event: self.update_settings())
         self.search_engine_combo.pack(fill=tk.X)
 
         ttk.Label(search_frame, text="Max Search Results:").pack(anchor=tk.W)
@@ -40,12 +81,76 @@ class SettingsPanel:
         self.search_timeout_spinbox.set(10)
         self.search_timeout_spinbox.pack(anchor=tk.W)
 
+        ttk.Label(search_frame, text="Read Top Result Pages:").pack(anchor=tk.W)
+        self.read_pages_spinbox = ttk.Spinbox(search_frame, from_=0, to=5, width=5, command=self.update_settings)
+        self.read_pages_spinbox.set(self.core_manager.search_read_pages)
+        self.read_pages_spinbox.bind("<FocusOut>", lambda event: self.update_settings())
+        self.read_pages_spinbox.pack(anchor=tk.W)
+
+        self.search_cache_var = tk.BooleanVar(value=self.core_manager.search_cache_enabled)
+        ttk.Checkbutton(search_frame, text="Reuse recent search results", variable=self.search_cache_var,
+                        command=self.update_settings).pack(anchor=tk.W)
+
     def model_selected(self, event=None):
         selected = self.model_combo.get()
-        self.core_manager.current_model = selected
+        self.core_manager.set_model(selected)
+
+    def on_models_changed(self, models, online):
+        # Called from the model registry's refresh thread.
+        self.frame.after(0, self.set_models, models)
+
+    def set_models(self, models):
+        if models:
+            self.model_combo['values'] = models
+            if not self.core_manager.current_model:
+                self.core_manager.set_model(models[0])
+                self.model_combo.set(models[0])
+
+    def on_model_status(self, model, status):
+        # Called from the CoreManager event loop thread.
+        self.frame.after(0, self.show_model_status, model, status)
+
+    def show_model_status(self, model, status):
+        if model != self.core_manager.current_model:
+            return
+        labels = {"loading": "loading…", "warm": "warm ✅", "cold": "cold", "error": "failed to load ❌"}
+        self.model_status_label.config(text=f"Model status: {labels.get(status, status)}")
+
+    def refresh_metrics(self):
+        self.metrics_tree.delete(*self.metrics_tree.get_children())
+        for model, row in sorted(self.core_manager.model_metrics().items()):
+            self.metrics_tree.insert("", tk.END, text=model, values=(
+                row["requests"],
+                f"{row['latency_p50']:.2f} / {row['latency_p95']:.2f}",
+                f"{row['time_to_first_token_p50']:.2f} / {row['time_to_first_token_p95']:.2f}",
+                f"{row['tokens_per_second_p50']:.1f}",
+                f"{row['load_duration_p50']:.2f}",
+            ))
+
+    def show_kb_status(self):
+        kb = self.core_manager.kb
+        text = f"Index: {kb.status}"
+        if kb.ready and kb.load_seconds is not None:
+            text += f" (loaded in {kb.load_seconds:.1f}s)"
+        self.kb_status_label.config(text=text)
+        self.frame.after(2000, self.show_kb_status)
+
+    def open_kb_manager(self):
+        from kb.kb_gui import KBGUI
+        window = tk.Toplevel(self.frame)
+        window.title("Local KB Manager")
+        # The manager rebuilds the index on disk; the chat swaps it in without waiting.
+        KBGUI(window, on_index_updated_callback=self.core_manager.reload_kb)
+
+    def update_cache_settings(self):
+        self.core_manager.response_cache_enabled = self.response_cache_var.get()
+        self.core_manager.force_response_cache = self.force_cache_var.get()
+        self.core_manager.semantic_cache_enabled = self.semantic_cache_var.get()
 
     def update_settings(self):
         self.core_manager.search_engine = self.search_engine_combo.get()
         self.core_manager.max_search_results = int(self.max_results_spinbox.get())
         self.core_manager.search_timeout = int(self.search_timeout_spinbox.get())
+        self.core_manager.search_read_pages = int(self.read_pages_spinbox.get())
+        self.core_manager.search_cache_enabled = self.search_cache_var.get()
 # This file was created by the setup script
@@ -0,0 +1,369 @@
+# server.py
+"""
+Local HTTP API for CoreManager: an OpenAI-compatible chat endpoint with the
+same retrieval (local KB, web search), prompt assembly, caches and backend
+routing as the GUI, for tools that have no use for a window.
+
+Endpoints:
+    POST   /v1/chat/completions   OpenAI chat request; "stream": true answers
+                                  with server-sent events
+    GET    /v1/models             models installed on the backends
+    GET    /v1/sessions           stored sessions (without messages)
+    POST   /v1/sessions           new session; body {"model": ..., "title": ...}
+    GET    /v1/sessions/{id}      one session with its messages
+    DELETE /v1/sessions/{id}
+
+A chat request is stateless by default: the last message is the question and
+the earlier ones are the conversation. With "session_id" the conversation is
+the stored session instead (only the last message is used), the exchange is
+appended to it and the session's KV context is reused between requests.
+"web_search" and "local_kb" turn retrieval on or off per request; any
+"system" messages replace the system prompt.
+
+All clients share one event loop. Model calls are admitted by the backends'
+schedulers (--concurrency in flight per backend, the rest queued) and more
+than --max-pending open chat requests are refused with 429.
+
+Example (from the repository root):
+    python -m ollama.server --port 8000 --model llama3 --kb
+    curl localhost:8000/v1/chat/completions -d '{"messages": [{"role": "user", "content": "Hi"}]}'
+
+Imports no GUI toolkit, so it runs on servers without a display.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ollama.core import api
+from ollama.core import session as session_manager
+from ollama.core.cancellation import CancellationToken
+from ollama.core.core_manager import CoreManager
+
+log = logging.getLogger("ollama.server")
+
+ACCESS_LOG_FORMAT = '%a "%r" %s %b %Tfs'
+
+
+def error_response(status, message, error_type="invalid_request_error", code=None):
+    return web.json_response({"error": {"message": message, "type": error_type, "code": code}}, status=status)
+
+
+def failure_status(result):
+    # HTTP status for a failed generation.
+    if result.get("cancelled"):
+        return 409  # superseded by a newer message in the same session
+    if result.get("error") == api.TIMEOUT_ERROR:
+        return 504
+    return 502
+
+
+def message_text(message):
+    # OpenAI content is a string or a list of parts; only text parts are used.
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        content = "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+def session_summary(session):
+    return {
+        "id": session.get("id"),
+        "title": session.get("title"),
+        "model": session.get("model"),
+        "created_at": session.get("created_at"),
+        "updated_at": session.get("updated_at"),
+        "messages": session.get("message_count", 0),
+    }
+
+
+def usage(metrics):
+    metrics = metrics or {}
+    prompt_tokens = metrics.get("prompt_eval_count") or 0
+    completion_tokens = metrics.get("eval_count") or 0
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+def finish_reason(result, num_predict):
+    eval_count = (result.get("metrics") or {}).get("eval_count")
+    return "length" if eval_count is not None and eval_count >= num_predict else "stop"
+
+
+class ChatServer:
+    """
+    aiohttp handlers around one CoreManager. The manager's current session and
+    model are never touched; every request names its own.
+    """
+
+    def __init__(self, core_manager, max_pending=64, web_search=False, local_kb=False):
+        self.core_manager = core_manager
+        self.max_pending = max_pending
+        self.web_search = web_search
+        self.local_kb = local_kb
+        self.pending = 0
+
+    def app(self):
+        app = web.Application()
+        app.add_routes([
+            web.post("/v1/chat/completions", self.chat_completions),
+            web.get("/v1/models", self.models),
+            web.get("/v1/sessions", self.list_sessions),
+            web.post("/v1/sessions", self.create_session),
+            web.get("/v1/sessions/{session_id}", self.get_session),
+            web.delete("/v1/sessions/{session_id}", self.delete_session),
+        ])
+        return app
+
+    async def blocking(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+    # Models and sessions.
+
+    async def models(self, request):
+        models = await self.core_manager.aget_models()
+        return web.json_response({"object": "list", "data": [
+            {"id": name, "object": "model", "created": 0, "owned_by": "ollama"} for name in models
+        ]})
+
+    async def list_sessions(self, request):
+        sessions = sorted(self.core_manager.sessions.values(), key=lambda s: s.get("updated_at", ""), reverse=True)
+        return web.json_response({"object": "list", "data": [session_summary(s) for s in sessions]})
+
+    async def create_session(self, request):
+        body = await request.json() if request.can_read_body else {}
+        model = body.get("model") or self.core_manager.current_model
+        session_id, session = await self.blocking(session_manager.new_session, model)
+        if body.get("title"):
+            session["title"] = body["title"]
+            await self.blocking(session_manager.save_session, session)
+        return web.json_response(session_summary(self.core_manager.sessions[session_id]), status=201)
+
+    async def get_session(self, request):
+        session = await self.blocking(self.core_manager.get_session, request.match_info["session_id"])
+        if session is None:
+            return error_response(404, "Session not found.", code="session_not_found")
+        stored = {key: value for key, value in session.items() if key not in session_manager.TRANSIENT_KEYS}
+        return web.json_response(stored)
+
+    async def delete_session(self, request):
+        session_id = request.match_info["session_id"]
+        if session_id not in self.core_manager.sessions:
+            return error_response(404, "Session not found.", code="session_not_found")
+        self.core_manager.cancel_generation(session_id, reason="Session deleted.")
+        await self.blocking(self.core_manager.delete_session, session_id)
+        return web.json_response({"id": session_id, "deleted": True})
+
+    # Chat.
+
+    async def chat_completions(self, request):
+        if self.pending >= self.max_pending:
+            return error_response(429, "Too many pending requests.", "rate_limit_error")
+        self.pending += 1
+        try:
+            return await self.chat(request)
+        finally:
+            self.pending -= 1
+
+    async def chat(self, request):
+        started = time.perf_counter()
+        try:
+            body = await request.json()
+        except json.JSONDecodeError:
+            return error_response(400, "Request body is not valid JSON.")
+        messages = body.get("messages")
+        if not isinstance(messages, list) or not messages or not all(isinstance(m, dict) for m in messages) \
+                or messages[-1].get("role") != "user":
+            return error_response(400, "messages must be a list ending with a user message.")
+        message = message_text(messages[-1])
+
+        session_id = body.get("session_id")
+        if session_id:
+            session = await self.blocking(self.core_manager.get_session, session_id)
+            if session is None:
+                return error_response(404, "Session not found.", code="session_not_found")
+        else:
+            # Throwaway session holding the client's transcript; never saved.
+            session = {"messages": [{"role": m.get("role"), "content": message_text(m)} for m in messages[:-1]
+                                    if m.get("role") in ("user", "assistant")]}
+        system = [message_text(m) for m in messages if m.get("role") == "system"]
+
+        model = body.get("model") or (session.get("model") if session_id else None) or self.core_manager.current_model
+        if model not in await self.core_manager.aget_models():
+            return error_response(404, f"Model '{model}' not found.", code="model_not_found")
+        num_predict = body.get("max_completion_tokens") or body.get("max_tokens") or self.core_manager.num_predict
+        settings = {
+            "session": session,
+            "model": model,
+            "system_prompt": "\n\n".join(system) if system else None,
+            "temperature": body.get("temperature"),
+            "num_predict": num_predict,
+        }
+        with_search = body.get("web_search", self.web_search)
+        with_local_kb = body.get("local_kb", self.local_kb)
+
+        if session_id:
+            await self.blocking(session_manager.store_message_in_session, session, "user", message)
+        completion = {"id": f"chatcmpl-{uuid.uuid4().hex}", "created": int(time.time()), "model": model}
+        cancel_token = CancellationToken()
+        if body.get("stream"):
+            response, result, first_token = await self.stream(
+                request, completion, message, with_search, with_local_kb, cancel_token, settings
+            )
+        else:
+            response, result, first_token = await self.complete(
+                completion, message, with_search, with_local_kb, cancel_token, settings
+            )
+        if session_id and result.get("success"):
+            await self.blocking(session_manager.store_message_in_session, session, "assistant",
+                                result.get("ai_response", ""), None if result.get("cached") else result.get("metrics"))
+
+        log.info(
+            "chat model=%s session=%s stream=%s status=%s cached=%s backend=%s tokens=%s first_token=%s latency=%.3fs",
+            model, session_id or "-", bool(body.get("stream")), response.status, result.get("cached", False),
+            result.get("backend", "-"), (result.get("metrics") or {}).get("eval_count", 0),
+            f"{first_token - started:.3f}s" if first_token else "-", time.perf_counter() - started
+        )
+        return response
+
+    async def generate(self, message, with_search, with_local_kb, cancel_token, settings, on_token=None):
+        try:
+            return await self.core_manager.agenerate_response(
+                message, with_search, with_local_kb, on_token=on_token, cancel_token=cancel_token, **settings
+            )
+        except asyncio.CancelledError:
+            # The client went away; stop the model as well.
+            cancel_token.cancel("Client disconnected.")
+            raise
+
+    def completion_body(self, completion, result, num_predict):
+        return {
+            **completion,
+            "object": "chat.completion",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": result.get("ai_response", "")},
+                "finish_reason": finish_reason(result, num_predict),
+            }],
+            "usage": usage(result.get("metrics")),
+            "cached": result.get("cached", False),
+            "backend": result.get("backend"),
+        }
+
+    async def complete(self, completion, message, with_search, with_local_kb, cancel_token, settings):
+        result = await self.generate(message, with_search, with_local_kb, cancel_token, settings)
+        if not result.get("success"):
+            return error_response(failure_status(result), result.get("error"), "api_error"), result, None
+        return web.json_response(self.completion_body(completion, result, settings["num_predict"])), result, None
+
+    async def stream(self, request, completion, message, with_search, with_local_kb, cancel_token, settings):
+        """
+        Streams the answer as chat.completion.chunk events. The response is
+        only started with the first token, so a request that fails before
+        producing anything still gets a plain HTTP error.
+        """
+        tokens = asyncio.Queue()
+        task = asyncio.ensure_future(self.generate(
+            message, with_search, with_local_kb, cancel_token, settings, on_token=tokens.put_nowait
+        ))
+        task.add_done_callback(lambda _: tokens.put_nowait(None))
+        response = None
+        first_token = None
+
+        def chunk(delta, reason=None, **extra):
+            data = {**completion, "object": "chat.completion.chunk",
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": reason}], **extra}
+            return f"data: {json.dumps(data)}\n\n".encode("utf-8")
+
+        async def start():
+            stream = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+            await stream.prepare(request)
+            await stream.write(chunk({"role": "assistant"}))
+            return stream
+
+        try:
+            while (token := await tokens.get()) is not None:
+                if response is None:
+                    first_token = time.perf_counter()
+                    response = await start()
+                await response.write(chunk({"content": token}))
+            result = task.result()
+            if response is None:
+                if not result.get("success"):
+                    return error_response(failure_status(result), result.get("error"), "api_error"), result, None
+                # Cached answers arrive whole.
+                response = await start()
+                await response.write(chunk({"content": result.get("ai_response", "")}))
+            if result.get("success"):
+                await response.write(chunk({}, finish_reason(result, settings["num_predict"]),
+                                           usage=usage(result.get("metrics")), cached=result.get("cached", False),
+                                           backend=result.get("backend")))
+            else:
+                # Already streaming: report the failure in-band, as OpenAI does.
+                error = {"error": {"message": result.get("error"), "type": "api_error", "code": None}}
+                await response.write(f"data: {json.dumps(error)}\n\n".encode("utf-8"))
+            await response.write(b"data: [DONE]\n\n")
+            await response.write_eof()
+            return response, result, first_token
+        except (ConnectionResetError, asyncio.CancelledError):
+            cancel_token.cancel("Client disconnected.")
+            task.cancel()
+            raise
+
+
+def configure(args):
+    core_manager = CoreManager(backends=args.backend, load_kb=args.kb)
+    for backend in core_manager.backend_pool.backends:
+        backend.scheduler.max_concurrent = args.concurrency
+    core_manager.web_search_enabled = True
+    if args.num_ctx:
+        core_manager.num_ctx = args.num_ctx
+    if args.system:
+        core_manager.system_prompt = args.system
+    if args.total_timeout:
+        core_manager.total_timeout = args.total_timeout
+    core_manager.warm_up_on_select = args.warm_up
+    model = args.model
+    if not model:
+        models = core_manager.get_models()
+        model = models[0] if models else None
+    # The default for requests without a model.
+    core_manager.set_model(model)
+    return core_manager
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model", help="model for requests that name none (default: the first installed model)")
+    parser.add_argument("--backend", action="append", help="Ollama URL; repeat for several servers")
+    parser.add_argument("--concurrency", type=int, default=2, help="model calls in flight per backend")
+    parser.add_argument("--max-pending", type=int, default=64, help="open chat requests before answering 429")
+    parser.add_argument("--web-search", action="store_true", help="search the web unless a request says otherwise")
+    parser.add_argument("--kb", action="store_true", help="use the local knowledge base unless a request says otherwise")
+    parser.add_argument("--num-ctx", type=int, help="context window (default: CoreManager's)")
+    parser.add_argument("--system", help="default system text")
+    parser.add_argument("--total-timeout", type=float, help="seconds allowed per answer")
+    parser.add_argument("--warm-up", action="store_true", help="preload the default model at startup")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    core_manager = configure(args)
+    server = ChatServer(core_manager, max_pending=args.max_pending, web_search=args.web_search, local_kb=args.kb)
+    # handler_cancellation: a client that disconnects cancels its generation.
+    web.run_app(server.app(), host=args.host, port=args.port, access_log_format=ACCESS_LOG_FORMAT,
+                handler_cancellation=True, print=lambda text: log.info(text.strip()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
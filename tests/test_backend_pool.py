@@ -0,0 +1,84 @@
+import pytest
+
+from benchmarks.mock_ollama import MockOllamaServer
+from ollama.core import api
+from ollama.core.api import CONNECTION_ERROR
+from ollama.core.backend_pool import BackendPool
+
+MODEL = "llama3:latest"
+
+
+@pytest.fixture
+def servers():
+    started = []
+
+    def start(**settings):
+        server = MockOllamaServer(first_token_delay=0.01, load_delay=0, response_tokens=3, token_rate=0, **settings)
+        server.start()
+        started.append(server)
+        return server
+
+    yield start
+    for server in started:
+        server.stop()
+
+
+def generate(url):
+    return api.generate_response(url, MODEL, "hi")
+
+
+def test_failing_backend_is_ejected_and_the_request_retried(servers):
+    failing, healthy = servers(error_rate=1.0), servers()
+    pool = BackendPool([failing.url, healthy.url], max_failures=1)
+
+    result = pool.call(MODEL, generate)
+    assert result["success"]
+    assert result["backend"] == healthy.url
+    status = {backend["url"]: backend for backend in pool.status()}
+    assert status[failing.url]["ejected"]
+    assert not status[healthy.url]["ejected"]
+
+    # Ejected backends are skipped while a healthy one is left.
+    assert pool.pick(MODEL).ollama_url == healthy.url
+
+
+def test_retry_only_before_the_first_token(servers):
+    first, second = servers(), servers()
+    pool = BackendPool([first.url, second.url])
+    calls = []
+
+    def failing(partial):
+        def request(url):
+            calls.append(url)
+            return {"success": False, "error": CONNECTION_ERROR, "ai_response": partial}
+        return request
+
+    pool.call(MODEL, failing(""))
+    assert calls == [first.url, second.url]
+
+    calls.clear()
+    result = pool.call(MODEL, failing("half an answer"))
+    assert len(calls) == 1
+    assert result["ai_response"] == "half an answer"
+
+
+def test_model_pulled_after_the_model_list_was_cached(servers):
+    server = servers()
+    pool = BackendPool([server.url])
+    assert "newmodel:latest" not in pool.get_models()
+
+    server.models.append("newmodel:latest")
+    result = pool.call("newmodel:latest", lambda url: api.generate_response(url, "newmodel:latest", "hi"))
+    assert result["success"]
+    assert "newmodel:latest" in pool.cached_models()
+
+
+def test_unknown_model_gets_the_servers_answer(servers):
+    server = servers()
+    pool = BackendPool([server.url])
+    pool.get_models()
+
+    result = pool.call("ghost:latest", lambda url: api.generate_response(url, "ghost:latest", "hi"))
+    assert not result["success"]
+    assert result["backend"] == server.url
+    assert "404" in result["error"]
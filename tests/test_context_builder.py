@@ -0,0 +1,70 @@
+from ollama.core.context_builder import ContextBuilder, estimate_tokens, truncate_to_tokens
+
+
+def turns(count, words=40):
+    return [{"role": "user" if i % 2 == 0 else "assistant",
+             "content": f"turn{i} " + " ".join(f"word{i}" for _ in range(words))} for i in range(count)]
+
+
+def test_input_budget_keeps_room_for_the_answer():
+    assert ContextBuilder.input_budget(4096, 512) == 3584
+    # Never more than half the window.
+    assert ContextBuilder.input_budget(4096, 8000) == 2048
+
+
+def test_truncate_to_tokens():
+    text = "word " * 500
+    assert truncate_to_tokens("short", 10) == "short"
+    assert estimate_tokens(truncate_to_tokens(text, 50)) <= 51
+    assert truncate_to_tokens(text, 0) == ""
+
+
+def test_whole_history_fits():
+    history = turns(4)
+    built = ContextBuilder().build("question?", 4000, history=history)
+    assert built["history_turns"] == 4
+    assert built["summarized_turns"] == built["dropped_turns"] == 0
+    assert built["prompt_tokens"] <= 4000
+
+
+def test_window_keeps_the_newest_turns_under_the_budget():
+    history = turns(40)
+    budget = 1000
+    built = ContextBuilder().build("question?", budget, history=history)
+    assert 0 < built["history_turns"] < len(history)
+    assert built["history_turns"] + built["summarized_turns"] + built["dropped_turns"] == len(history)
+    assert built["prompt_tokens"] <= budget
+    assert history[-1]["content"] in built["prompt"]
+    assert history[0]["content"] not in built["prompt"]
+    # Some of the cut turns are summarized in one line each.
+    assert built["summarized_turns"] > 0
+    assert "Earlier in this conversation (summarized):" in built["prompt"]
+
+
+def test_retrieval_is_capped_by_its_share():
+    search_results = "result " * 5000
+    built = ContextBuilder(retrieval_share=0.5).build("question?", 1000, search_results=search_results,
+                                                      history=turns(2))
+    assert built["prompt_tokens"] <= 1000
+    assert built["history_turns"] == 2
+
+
+def test_kv_context_is_kept_only_while_it_fits():
+    history = turns(10)
+    builder = ContextBuilder()
+    kept = builder.build("question?", 2000, history=history, carried_tokens=500)
+    assert kept["use_context"] and kept["history_turns"] == 0
+    assert "turn0" not in kept["prompt"]
+
+    overflow = builder.build("question?", 2000, history=history, carried_tokens=1990)
+    assert not overflow["use_context"]
+    assert overflow["history_turns"] > 0
+    assert overflow["prompt_tokens"] <= 2000
+
+
+def test_system_prompt_override():
+    builder = ContextBuilder(system_prompt="Default system.")
+    assert builder.build("q", 1000)["prompt"].startswith("Default system.")
+    built = builder.build("q", 1000, system_prompt="Override.")
+    assert built["prompt"].startswith("Override.")
+    assert "Default system." not in built["prompt"]
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+
+from ollama.core.cancellation import CancellationToken
+from ollama.core.scheduler import BATCH, INTERACTIVE, WARMUP, RequestScheduler
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def queue_waiter(scheduler, priority, order, name, cancel_token=None):
+    def run():
+        with scheduler.slot(priority, cancel_token) as admitted:
+            order.append((name, admitted))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_queued_requests_are_admitted_by_priority():
+    scheduler = RequestScheduler(max_concurrent=1)
+    order = []
+    assert scheduler.acquire(INTERACTIVE)
+    threads = []
+    for priority, name in ((BATCH, "batch"), (WARMUP, "warmup"), (INTERACTIVE, "first"), (INTERACTIVE, "second")):
+        threads.append(queue_waiter(scheduler, priority, order, name))
+        wait_until(lambda: scheduler.outstanding() == len(threads) + 1)
+
+    scheduler.release()
+    for thread in threads:
+        thread.join(2)
+    assert [name for name, _ in order] == ["first", "second", "warmup", "batch"]
+    assert scheduler.metrics()["in_flight"] == 0
+
+
+def test_concurrency_cap():
+    scheduler = RequestScheduler(max_concurrent=2)
+    assert scheduler.acquire() and scheduler.acquire()
+    order = []
+    thread = queue_waiter(scheduler, INTERACTIVE, order, "third")
+    wait_until(lambda: scheduler.metrics()["queue_depth"] == 1)
+    assert order == []
+    scheduler.release()
+    thread.join(2)
+    assert order == [("third", True)]
+    scheduler.release()
+    assert scheduler.outstanding() == 0
+
+
+def test_cancel_while_queued_abandons_the_place_in_line():
+    scheduler = RequestScheduler(max_concurrent=1)
+    assert scheduler.acquire()
+    order = []
+    token = CancellationToken()
+    thread = queue_waiter(scheduler, INTERACTIVE, order, "cancelled", token)
+    wait_until(lambda: scheduler.outstanding() == 2)
+
+    token.cancel()
+    thread.join(2)
+    assert order == [("cancelled", False)]
+    assert scheduler.outstanding() == 1
+
+    # The abandoned waiter does not take the slot when it frees up.
+    scheduler.release()
+    assert scheduler.metrics()["in_flight"] == 0
+    assert scheduler.acquire()
+    scheduler.release()
+
+
+def test_cancelled_async_waiter_frees_its_slot():
+    scheduler = RequestScheduler(max_concurrent=1)
+
+    async def main():
+        async with scheduler.async_slot():
+            waiter = asyncio.ensure_future(scheduler.acquire_async(BATCH))
+            await asyncio.sleep(0.01)
+            assert scheduler.metrics()["classes"]["batch"]["queued"] == 1
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+        assert scheduler.outstanding() == 0
+
+    asyncio.run(main())
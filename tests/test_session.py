@@ -0,0 +1,50 @@
+import json
+import os
+
+from ollama.core import session as session_manager
+
+
+def make_session(sessions_dir, session_id="session_test"):
+    session = {"id": session_id, "title": "Test", "model": "m", "messages": [],
+               "created_at": "2025-01-01 00:00:00", "updated_at": "2025-01-01 00:00:00"}
+    session_manager.write_snapshot(session, sessions_dir)
+    return session
+
+
+def contents(session):
+    return [message["content"] for message in session["messages"]]
+
+
+def test_append_after_torn_journal_line(tmp_path):
+    sessions_dir = str(tmp_path)
+    session = make_session(sessions_dir)
+    session_manager.store_message_in_session(session, "user", "m0", sessions_dir=sessions_dir)
+    # A crash in the middle of appending "m1": the line is cut short, no newline.
+    torn = json.dumps({"seq": 1, "message": {"role": "assistant", "content": "m1"}})[:25]
+    with open(os.path.join(sessions_dir, "session_test.jsonl"), "a", encoding="utf-8") as f:
+        f.write(torn)
+
+    session = session_manager.read_session(sessions_dir, "session_test")
+    assert contents(session) == ["m0"]
+    session_manager.store_message_in_session(session, "assistant", "m1-retry", sessions_dir=sessions_dir)
+    session_manager.store_message_in_session(session, "user", "m2", sessions_dir=sessions_dir)
+
+    assert contents(session_manager.read_session(sessions_dir, "session_test")) == ["m0", "m1-retry", "m2"]
+
+
+def test_catalog_catches_journal_append_it_missed(tmp_path):
+    sessions_dir = str(tmp_path)
+    session = make_session(sessions_dir)
+    session_manager.store_message_in_session(session, "user", "m0", sessions_dir=sessions_dir)
+    assert session_manager.get_catalog(sessions_dir).headers["session_test"]["message_count"] == 1
+
+    # A message that reached the session journal but whose catalog record was lost.
+    journal_file = os.path.join(sessions_dir, "session_test.jsonl")
+    session_manager.append_journal("session_test", journal_file,
+                                   {"seq": 1, "message": {"role": "assistant", "content": "m1"}})
+    stat = os.stat(journal_file)
+    os.utime(journal_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+
+    session_manager._catalogs.pop(sessions_dir)
+    headers = session_manager.get_catalog(sessions_dir).headers
+    assert headers["session_test"]["message_count"] == 2
@@ -8,11 +8,16 @@ import webbrowser
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import requests
-import json
 import time
 from ttkbootstrap import Style
 from PIL import Image, ImageTk
 from io import BytesIO
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ollama.core import api
+from ollama.core.model_registry import get_registry
+
+OLLAMA_URL = "http://localhost:11434"
 
 
 class OllamaSetupWizard:
@@ -30,6 +35,8 @@ class OllamaSetupWizard:
 
         # Variables
         self.system = platform.system()
+        # Shared /api/tags cache; the chat settings panel reads the same one.
+        self.model_registry = get_registry(OLLAMA_URL)
         self.ollama_installed = False
         self.ollama_running = False
         self.featured_models = [
@@ -138,31 +145,29 @@ class OllamaSetupWizard:
 
         self.model_vars = {}
         self.model_checkbuttons = {}
-        try:
-            response = requests.get("http://localhost:11434/api/tags", timeout=2)
-            if response.status_code == 200:
-                downloaded_models = [model["name"] for model in response.json().get("models", [])]
-            else:
-                downloaded_models = []
-        except Exception:
-            downloaded_models = []
-
+        self.model_status_labels = {}
         for model in self.featured_models:
             frame = ttk.Frame(self.model_scrollable_frame)
             frame.pack(fill=tk.X, pady=5)
-            is_downloaded = any(model["name"].split(":")[0] in m for m in downloaded_models)
             self.model_vars[model["name"]] = tk.BooleanVar(value=False)
             checkbox = ttk.Checkbutton(frame, text=f"{model['name']} ({model['size']})",
-                                       variable=self.model_vars[model["name"]],
-                                       state=tk.DISABLED if is_downloaded else tk.NORMAL)
+                                       variable=self.model_vars[model["name"]])
             checkbox.pack(side=tk.LEFT, padx=5)
             self.model_checkbuttons[model["name"]] = checkbox
-            if is_downloaded:
-                status = ttk.Label(frame, text="✅ Already downloaded", foreground="green")
-                status.pack(side=tk.LEFT, padx=5)
+            status = ttk.Label(frame, text="", foreground="green")
+            status.pack(side=tk.LEFT, padx=5)
+            self.model_status_labels[model["name"]] = status
             desc = ttk.Label(frame, text=model["description"], wraplength=500)
             desc.pack(side=tk.LEFT, padx=10)
 
+        # Fill the "downloaded" marks from the cache now and from every later
+        # refresh, instead of blocking the Tk thread on /api/tags.
+        self.apply_downloaded_models(self.model_registry.cached_models())
+        self.model_registry.subscribe(
+            lambda models, online: self.root.after(0, self.apply_downloaded_models, models)
+        )
+        self.model_registry.refresh_in_background()
+
         custom_frame = ttk.LabelFrame(self.model_scrollable_frame, text="Custom Model", padding=10)
         custom_frame.pack(fill=tk.X, pady=10)
         ttk.Label(custom_frame, text="Model name:").pack(side=tk.LEFT, padx=5)
@@ -306,17 +311,13 @@ class OllamaSetupWizard:
             self.log_prereq(f"⚠️ Error checking Ollama installation: {str(e)}")
             self.ollama_installed = False
 
-    def check_ollama_running(self):
-        try:
-            response = requests.get("http://localhost:11434/api/tags", timeout=2)
-            self.ollama_running = (response.status_code == 200)
-            if self.ollama_running:
-                self.log_prereq("✅ Ollama service is running")
-            else:
-                self.log_prereq("⚠️ Ollama service is not running")
-        except Exception:
+    def check_ollama_running(self, max_age=None):
+        # max_age=0 forces a fresh /api/tags round-trip (e.g. right after starting the service).
+        self.ollama_running = self.model_registry.check_server_connection(max_age=max_age)
+        if self.ollama_running:
+            self.log_prereq("✅ Ollama service is running")
+        else:
             self.log_prereq("⚠️ Ollama service is not running")
-            self.ollama_running = False
 
     def install_or_start(self):
         # In this one-screen design the installation section shows an action button.
@@ -449,7 +450,7 @@ class OllamaSetupWizard:
                 subprocess.Popen(["ollama", "serve"])
             self.update_install_step("Waiting for service to start")
             time.sleep(5)
-            self.check_ollama_running()
+            self.check_ollama_running(max_age=0)
             if self.ollama_running:
                 self.log_install("✅ Ollama service is now running!")
             else:
@@ -480,26 +481,25 @@ class OllamaSetupWizard:
             try:
                 self.model_step_label.config(text=f"Downloading {model}...")
                 self.append_model_log(f"Downloading {model}...\n")
-                response = requests.post(
-                    "http://localhost:11434/api/pull",
-                    json={"name": model},
-                    stream=True
-                )
-                if response.status_code != 200:
-                    self.append_model_log(f"❌ Failed to download {model}: HTTP {response.status_code}\n")
-                    continue
-                for line in response.iter_lines():
-                    if line:
-                        data = json.loads(line)
-                        if 'status' in data:
-                            self.append_model_log(f"{data['status']}\n")
-                        if data.get('completed', False):
-                            self.append_model_log(f"✅ Successfully downloaded {model}\n\n")
-                            self.root.after(0, lambda m=model: self.update_model_status(m))
+                # Pulls run in the scheduler's lowest priority class so chat stays responsive.
+                for data in api.pull_model(OLLAMA_URL, model):
+                    if 'status' in data:
+                        self.append_model_log(f"{data['status']}\n")
+                    if data.get('completed', False):
+                        self.append_model_log(f"✅ Successfully downloaded {model}\n\n")
+                        self.root.after(0, lambda m=model: self.update_model_status(m))
                 self.model_step_label.config(text=f"Finished downloading {model}")
             except Exception as e:
                 self.append_model_log(f"❌ Error downloading {model}: {str(e)}\n")
         self.download_button.config(state=tk.NORMAL)
+        # Let the chat model list pick up what was just pulled.
+        self.model_registry.refresh_in_background(force=True)
+
+    def apply_downloaded_models(self, downloaded_models):
+        for name, checkbox in self.model_checkbuttons.items():
+            if any(name.split(":")[0] in m for m in downloaded_models):
+                checkbox.config(state=tk.DISABLED)
+                self.model_status_labels[name].config(text="✅ Already downloaded")
 
     def update_model_status(self, model):
         if hasattr(self, 'model_checkbuttons') and model in self.model_checkbuttons: